@@ -0,0 +1,115 @@
+import csv
+import json
+import os
+import random
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, List
+from bwtb_data import signin, get_member_id, export_workout_csv, BASE_URL
+from pipeline_metrics import metrics
+
+class Account(NamedTuple):
+	username: str
+	password: str
+	output: str
+
+class ExportResult(NamedTuple):
+	username: str
+	output: str
+	status: str
+	attempts: int
+	seconds: float
+	error: str
+
+DOWNLOADED = 'downloaded'
+UNCHANGED = 'unchanged'
+FAILED = 'failed'
+
+_exports = metrics.counter('bwtb_exports_total', 'Accounts exported from beyondthewhiteboard.com by status')
+_export_seconds = metrics.histogram('bwtb_export_seconds', 'Time spent signing in and exporting an account, including retries')
+
+def load_manifest(path: str, outputdir: str = 'exports') -> List[Account]:
+	# A .CSV file with username and password columns and an optional output column. Accounts without an output are
+	# exported to <outputdir>/<username>.csv
+	accounts = []
+	with open(path, 'r', encoding='utf8', newline=None) as f:
+		for row in csv.DictReader(f):
+			output = row.get('output') or os.path.join(outputdir, f'{row["username"]}.csv')
+			accounts.append(Account(row['username'], row['password'], output))
+	return accounts
+
+def _is_transient(error: Exception) -> bool:
+	if (isinstance(error, (requests.ConnectionError, requests.Timeout))):
+		return True
+	if (isinstance(error, requests.HTTPError) and error.response != None):
+		return error.response.status_code == 429 or error.response.status_code >= 500
+	return False
+
+def _export_account(account: Account, adapter: HTTPAdapter, base_url: str, retry: int, backoff: float) -> ExportResult:
+	start = time.perf_counter()
+	attempt = 0
+	while True:
+		attempt += 1
+		try:
+			# Every account signs in with its own cookies while the connections are shared by all of them. The session is
+			# not closed because that would close the shared adapter.
+			s = requests.session()
+			s.mount('https://', adapter)
+			s.mount('http://', adapter)
+			signin(account.username, account.password, s, base_url)
+			memberId = get_member_id(s, base_url)
+			directory = os.path.dirname(account.output)
+			if (len(directory) > 0):
+				os.makedirs(directory, exist_ok=True)
+			status = DOWNLOADED if export_workout_csv(memberId, account.output, s, stream=True, base_url=base_url) else UNCHANGED
+			return ExportResult(account.username, account.output, status, attempt, time.perf_counter() - start, None)
+		except Exception as e:
+			if (_is_transient(e) == False or attempt >= retry):
+				return ExportResult(account.username, account.output, FAILED, attempt, time.perf_counter() - start, f'{type(e).__name__}: {e}')
+			time.sleep(random.uniform(0, backoff * (2 ** (attempt - 1))))
+
+def export_accounts(accounts: List[Account], workers: int = 8, base_url: str = BASE_URL, retry: int = 3, backoff: float = 1.0, onexport = None) -> List[ExportResult]:
+	# Exports up to workers accounts at a time. A failed account does not stop the others and is reported in its result.
+	adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+	results = []
+
+	def export(account: Account) -> ExportResult:
+		result = _export_account(account, adapter, base_url, retry, backoff)
+		_exports.inc(status=result.status)
+		_export_seconds.observe(result.seconds)
+		if (onexport != None):
+			onexport(result)
+		return result
+
+	try:
+		with ThreadPoolExecutor(max_workers=workers) as executor:
+			results = list(executor.map(export, accounts))
+	finally:
+		adapter.close()
+	return results
+
+def save_summary(results: List[ExportResult], path: str):
+	with open(path, 'w+', encoding='utf8', newline=None) as f:
+		json.dump([result._asdict() for result in results], f, indent=4)
+
+if __name__ == "__main__":
+	import sys
+
+	if (len(sys.argv) < 2):
+		raise Exception('Must provide a manifest of accounts')
+
+	manifest = sys.argv[1]
+	outputdir = 'exports' if (len(sys.argv) <= 2) else sys.argv[2]
+	workers = 8 if (len(sys.argv) <= 3) else int(sys.argv[3])
+	base_url = BASE_URL if (len(sys.argv) <= 4) else sys.argv[4]
+
+	start = time.perf_counter()
+	results = export_accounts(load_manifest(manifest, outputdir), workers=workers, base_url=base_url, onexport=lambda result: print(f'{result.status:<10} {result.username} {result.error or result.output}'))
+	os.makedirs(outputdir, exist_ok=True)
+	save_summary(results, os.path.join(outputdir, 'summary.json'))
+
+	counts = dict((status, sum(1 for result in results if result.status == status)) for status in [DOWNLOADED, UNCHANGED, FAILED])
+	print(f'Exported {len(results)} accounts in {time.perf_counter() - start:.1f}s: {counts[DOWNLOADED]} downloaded, {counts[UNCHANGED]} unchanged, {counts[FAILED]} failed')
+	print('Summary saved to', os.path.join(outputdir, 'summary.json'))
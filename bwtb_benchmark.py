@@ -0,0 +1,678 @@
+import csv
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from bwtb_data import parse_workout_csv, configure_parse_cache, parse_cache_stats, Measurement, Movement, Workout, _UNDECIDED, _movement_cache
+from bwtb_generate_csv import generate_workout_csv, generate_workout_rows
+from wodify_data import WorkoutResults, Gymnastics, Weighlifting
+
+def _measure(name, run, label = 'rows'):
+	start = time.perf_counter()
+	count = run()
+	elapsed = time.perf_counter() - start
+	print(f'{name:<40} {count:>8} {label} {elapsed:>8.2f}s {count / elapsed if elapsed > 0 else 0:>12.0f} {label}/sec')
+	return elapsed
+
+def benchmark_parse(csvpath, workers = os.cpu_count()):
+	print(f'Parsing {csvpath} with up to {workers} workers')
+	baseline = _measure('parse_workout_csv', lambda: sum(1 for _ in parse_workout_csv(csvpath)))
+	parallel = _measure(f'parse_workout_csv(workers={workers})', lambda: sum(1 for _ in parse_workout_csv(csvpath, workers=workers)))
+	print(f'Speedup: {baseline / parallel:.2f}x')
+
+	baseline = _measure('WorkoutResults.from_bwtb_csv', lambda: len(WorkoutResults.from_bwtb_csv(csvpath)))
+	parallel = _measure(f'WorkoutResults.from_bwtb_csv(workers={workers})', lambda: len(WorkoutResults.from_bwtb_csv(csvpath, workers=workers)))
+	print(f'Speedup: {baseline / parallel:.2f}x')
+
+def benchmark_cache(csvpath, maxsize = 4096):
+	print(f'Parsing {csvpath} with a parse cache of {maxsize} entries')
+	configure_parse_cache(0)
+	baseline = _measure('parse_workout_csv (no cache)', lambda: sum(1 for _ in parse_workout_csv(csvpath)))
+	configure_parse_cache(maxsize)
+	cached = _measure('parse_workout_csv (cache)', lambda: sum(1 for _ in parse_workout_csv(csvpath)))
+	print(f'Speedup: {baseline / cached:.2f}x')
+	for (name, stats) in parse_cache_stats().items():
+		total = stats.hits + stats.misses
+		print(f'{name:<12} hits={stats.hits} misses={stats.misses} evictions={stats.evictions} size={stats.size}/{stats.maxsize} hit rate={stats.hits / total if total > 0 else 0:.1%}')
+
+def _measurement_corpus(csvpath):
+	# The measurement strings that the parser sees: the results column and the loads that follow movements
+	corpus = []
+	with open(csvpath, 'r', encoding='utf8', newline=None) as csvfile:
+		reader = csv.reader(csvfile)
+		next(reader, None)
+		for row in reader:
+			corpus.extend(part.strip() for part in row[7].split('|')[0].split('+') if len(part.strip()) > 0)
+			for line in row[9].split('\n'):
+				if (', ' in line):
+					corpus.extend(part.strip() for part in line.split(', ', 1)[1].split('|') if len(part.strip()) > 0)
+	return corpus
+
+def benchmark_units(csvpath, repeat = 10):
+	corpus = _measurement_corpus(csvpath)
+	units = [text.split(' ', 1)[1] for text in corpus if ' ' in text]
+	print(f'Parsing {len(corpus)} measurements and {len(units)} units from {csvpath} {repeat} times')
+	configure_parse_cache(0)
+
+	def parse_units():
+		for _ in range(repeat):
+			for unit in units:
+				Measurement._parse_unit_and_factor(unit)
+		return len(units) * repeat
+
+	def parse_measurements():
+		parsed = 0
+		for _ in range(repeat):
+			for text in corpus:
+				try:
+					Measurement._parse(text)
+					parsed += 1
+				except:
+					pass
+		return parsed
+
+	_measure('Measurement._parse_unit_and_factor', parse_units, label='units')
+	_measure('Measurement._parse', parse_measurements, label='measurements')
+
+def _movement_corpus(csvpath):
+	# Every line of every description, including the lines that are not movements
+	corpus = []
+	with open(csvpath, 'r', encoding='utf8', newline=None) as csvfile:
+		reader = csv.reader(csvfile)
+		next(reader, None)
+		for row in reader:
+			corpus.extend(row[9].split('\n'))
+	return corpus
+
+def _movement_variants(corpus):
+	# Edits of every distinct line that reach the corners of the grammar, such as counts that only int() accepts
+	variants = []
+	for line in set(corpus):
+		(reps, _, rest) = line.partition(' ')
+		variants.extend([f'+{line}', f'{reps}\t{rest}', reps, f', {line}', line.replace(', ', ',', 1), line.replace(' | ', ': ', 1), f'a,{line}', f'{line}|', f'Rest in between {line}', f'RESTING {reps}', f'{reps}_0 {rest}', f'\u0663{line}', f'\u00b2{line}'])
+	return variants
+
+def _parse_outcome(parse, line):
+	try:
+		return parse(line)
+	except RecursionError as e:
+		# The message depends on where the stack ran out
+		return type(e)
+	except Exception as e:
+		return (type(e), str(e))
+
+def benchmark_movements(csvpath, repeat = 10):
+	# Checks that the grammar parses every line exactly as the legacy parser does and compares how quickly they do it
+	corpus = _movement_corpus(csvpath)
+	variants = _movement_variants(corpus)
+	print(f'Comparing {len(corpus)} lines from {csvpath} and {len(variants)} variants of them')
+	configure_parse_cache(0)
+
+	differences = 0
+	undecided = 0
+	for line in corpus + variants:
+		expected = _parse_outcome(Movement._parse_legacy, line)
+		actual = _parse_outcome(Movement._parse_uncached, line)
+		if (expected != actual):
+			differences += 1
+			if (differences <= 10):
+				print(f'DIFFERENCE {line!r}: {expected!r} != {actual!r}')
+		if (_parse_outcome(Movement._parse_grammar, line) is _UNDECIDED):
+			undecided += 1
+	print(f'{differences} differences, {undecided} lines left to the legacy parser')
+
+	def parse(name, parse):
+		def run():
+			parsed = 0
+			for _ in range(repeat):
+				for line in corpus:
+					try:
+						parse(line)
+						parsed += 1
+					except:
+						pass
+			return parsed
+		return _measure(name, run, label='lines')
+
+	print(f'Parsing {len(corpus)} lines {repeat} times')
+	legacy = parse('legacy', Movement._parse_legacy)
+	grammar = parse('grammar', Movement._parse_uncached)
+	print(f'Speedup: {legacy / grammar:.2f}x')
+
+	# Measurements are usually cached, which leaves the cost of reading the line itself
+	configure_parse_cache(4096)
+	_movement_cache.resize(0)
+	legacy = parse('legacy (cached measurements)', Movement._parse_legacy)
+	grammar = parse('grammar (cached measurements)', Movement._parse_uncached)
+	print(f'Speedup: {legacy / grammar:.2f}x')
+	if (differences > 0):
+		sys.exit(1)
+
+def _traced_memory(build):
+	gc.collect()
+	tracemalloc.start()
+	try:
+		retained = build()
+		gc.collect()
+		(current, peak) = tracemalloc.get_traced_memory()
+	finally:
+		tracemalloc.stop()
+	return (retained, current, peak)
+
+def _build_lists(records):
+	lists = ([], [], [])
+	for record in records:
+		lists[0 if isinstance(record, Gymnastics) else 1 if isinstance(record, Weighlifting) else 2].append(record)
+	return lists
+
+def benchmark_memory(csvpath, repeat = 1):
+	print(f'Measuring the memory held by the results of {csvpath} repeated {repeat} times')
+	results = list(parse_workout_csv(csvpath)) * repeat
+
+	(lists, baseline, _) = _traced_memory(lambda: _build_lists(WorkoutResults.iter_bwtb(results)))
+	count = sum(len(l) for l in lists)
+	del lists
+	(compact, current, _) = _traced_memory(lambda: WorkoutResults.from_bwtb(results))
+	print(f'{"lists of NamedTuples":<40} {count:>8} results {baseline / 1024:>10.0f} KiB {baseline / max(count, 1):>8.1f} bytes/result')
+	print(f'{"WorkoutResults":<40} {len(compact):>8} results {current / 1024:>10.0f} KiB {current / max(len(compact), 1):>8.1f} bytes/result')
+	print(f'Reduction: {baseline / current:.2f}x')
+
+def benchmark_allocations(csvpath, maxsize = 0):
+	print(f'Measuring the allocations made while parsing {csvpath} with a parse cache of {maxsize} entries')
+	configure_parse_cache(maxsize)
+	gc.collect()
+	tracemalloc.start()
+	try:
+		results = list(parse_workout_csv(csvpath))
+		gc.collect()
+		(current, peak) = tracemalloc.get_traced_memory()
+		blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+	finally:
+		tracemalloc.stop()
+	print(f'{"retained":<40} {current / 1024:>10.0f} KiB {blocks:>10} blocks {current / max(len(results), 1):>8.1f} bytes/row')
+	print(f'{"peak":<40} {peak / 1024:>10.0f} KiB')
+
+def benchmark_analytics(csvpath, records = 1000000):
+	from wodify_analytics import StrengthAnalytics
+
+	results = WorkoutResults.from_bwtb(parse_workout_csv(csvpath))
+	if (len(results.weightlifting) == 0):
+		print('There are no weightlifting results in', csvpath)
+		return
+
+	# Every copy of the weightlifting results in the export stands in for another athlete
+	start = time.perf_counter()
+	analytics = StrengthAnalytics()
+	athletes = 0
+	while (athletes * len(results.weightlifting) < records):
+		analytics.add(results, athlete=f'athlete-{athletes}')
+		athletes += 1
+	print(f'Loaded {len(analytics)} weightlifting results for {athletes} athletes in {time.perf_counter() - start:.2f}s')
+
+	for (name, run) in [('personal_records', analytics.personal_records), ('estimated_1rm_records (epley)', lambda: analytics.estimated_1rm_records('epley')), ('estimated_1rm_records (brzycki)', lambda: analytics.estimated_1rm_records('brzycki')), ('weekly_totals', analytics.weekly_totals)]:
+		start = time.perf_counter()
+		groups = len(run().name)
+		print(f'{name:<40} {groups:>8} groups {time.perf_counter() - start:>8.3f}s')
+
+class _StandInDriver:
+	def refresh(self):
+		pass
+
+	def quit(self):
+		pass
+
+def benchmark_import(csvpath, workers = 4, delay = 20, records = 200):
+	# A stand-in driver that takes delay milliseconds per record, so that the pool can be measured without a browser
+	from itertools import chain, islice
+	from wodify_driver import WodifyDriver, _HANDLERS
+
+	def add(result, driver):
+		time.sleep(delay / 1000)
+		return True
+
+	results = WorkoutResults.from_bwtb_csv(csvpath)
+	results = list(islice(chain(results.gymnastics, results.weightlifting, results.metcons), records))
+	handlers = dict((kind, add) for kind in _HANDLERS)
+	print(f'Importing {len(results)} records at {delay}ms per record')
+	baseline = _measure('import_parallel(workers=1)', lambda: WodifyDriver.import_parallel(results, workers=1, driverfactory=_StandInDriver, handlers=handlers), label='records')
+	parallel = _measure(f'import_parallel(workers={workers})', lambda: WodifyDriver.import_parallel(results, workers=workers, driverfactory=_StandInDriver, handlers=handlers), label='records')
+	print(f'Speedup: {baseline / parallel:.2f}x')
+
+def _form_ids():
+	# The IDs of the add performance form, taken from the HTTP engine, which reads them from the page that it posts
+	import wodify_http
+
+	return set([wodify_http.COMPONENT_TYPE, wodify_http.COMPONENT_NON_METCON, wodify_http.COMPONENT_METCON, wodify_http.DESCRIPTION, wodify_http.RESULT_TYPE, wodify_http.DATE, wodify_http.REP_SCHEME, wodify_http.SETS, wodify_http.REPS, wodify_http.WEIGHT, wodify_http.COMMENT, wodify_http.PRESCRIBED, wodify_http.SAVE] + \
+		[wodify_http._RESULT_EDIT + 'wtPerformanceResult_' + field for field in ['Distance', 'DistanceUOM', 'Minutes', 'Seconds', 'Rounds', 'Calories']] + \
+		['AthleteTheme_wt1_block_wtSubNavigation_wt14_wt14', 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_wtAddButton', 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_wtComponentEdit_wt72'])
+
+class _FormElement:
+	def __init__(self, driver, id, value = None):
+		self.driver = driver
+		self.id = id
+		self.value = value
+		self.tag_name = 'option' if value != None else 'select' if id in driver.options else 'input'
+
+	def is_displayed(self):
+		return True
+
+	def is_enabled(self):
+		return True
+
+	def is_selected(self):
+		return False
+
+	def get_attribute(self, name):
+		return self.driver.values.get(self.id) if name == 'value' else None
+
+	def get_dom_attribute(self, name):
+		return None
+
+	def find_elements(self, by, value):
+		return [_FormElement(self.driver, self.id, option) for (_, option) in self.driver.options[self.id] if f'"{option}"' in value]
+
+	def clear(self):
+		self.driver.values.pop(self.id, None)
+
+	def send_keys(self, value):
+		self.driver.values[self.id] = self.driver.values.get(self.id, '') + value
+
+	def click(self):
+		if (self.value != None):
+			self.driver.values[self.id] = self.value
+		elif (self.id == self.driver.save):
+			self.driver.saved.append(dict(self.driver.values))
+
+class _FormDriver:
+	# A stand-in for a browser on the add performance form. Only the IDs of the real form exist, so a field that is
+	# filled in under any other ID is not found, the way that document.getElementById would not find it.
+	def __init__(self, components):
+		import wodify_http
+		from wodify_driver import _FILL_SCRIPT, _OPTIONS_SCRIPT
+
+		self.ids = _form_ids()
+		self.save = wodify_http.SAVE
+		self.scripts = {_FILL_SCRIPT: self._fill, _OPTIONS_SCRIPT: lambda id: [['Select a component', '']] + [list(option) for option in self.options.get(id, [])]}
+		options = [(name, str(position)) for (position, name) in enumerate(components)]
+		self.options = {wodify_http.COMPONENT_TYPE: [('Gymnastics', '1'), ('Metcon', '2'), ('Weightlifting', '5')], wodify_http.COMPONENT_NON_METCON: options, wodify_http.COMPONENT_METCON: options, wodify_http.RESULT_TYPE: [(str(type), str(type)) for type in range(10)]}
+		self.values = {}
+		self.saved = []
+		self.unknown = set()
+
+	def find_element(self, by, value):
+		from selenium.common.exceptions import NoSuchElementException
+
+		if (value not in self.ids):
+			self.unknown.add(value)
+			raise NoSuchElementException(value)
+		return _FormElement(self, value)
+
+	def find_element_by_id(self, id):
+		return self.find_element('id', id)
+
+	def execute_script(self, script, *args):
+		return self.scripts[script](*args)
+
+	def _fill(self, fields):
+		filled = {}
+		for (id, value) in fields.items():
+			if (id not in self.ids):
+				self.unknown.add(id)
+				filled[id] = None
+			else:
+				self.values[id] = value
+				filled[id] = value
+		return filled
+
+	def implicitly_wait(self, seconds):
+		pass
+
+	def refresh(self):
+		self.values = {}
+
+	def quit(self):
+		pass
+
+def benchmark_fill(csvpath, records = 200):
+	# Enters results with the browser handlers on a stand-in of the form and fails when any field is filled in under
+	# an ID that the form does not have
+	from itertools import chain, islice
+	from wodify_driver import _HANDLERS, configure_catalog, configure_waits
+
+	results = WorkoutResults.from_bwtb_csv(csvpath)
+	results = list(islice(chain(results.gymnastics, results.weightlifting, results.metcons), records))
+	driver = _FormDriver(sorted(set(['Non-Benchmark Metcon'] + [r.name for r in results[::2]])))
+	configure_catalog(path=None)
+	configure_waits(default=0.2, minimum=0.05, maximum=0.2)
+	failed = 0
+	print(f'Filling in {len(results)} records on a stand-in of the add performance form')
+	for result in results:
+		try:
+			_HANDLERS[type(result)](result, driver)
+		except Exception as e:
+			failed += 1
+			if (failed <= 10):
+				print(f'FAILED [{result.date}] {result.name}: {type(e).__name__}')
+	print(f'Saved {len(driver.saved)} forms, {failed} failed')
+	for id in sorted(driver.unknown):
+		print('UNKNOWN ID', id)
+	if (failed > 0 or len(driver.unknown) > 0):
+		sys.exit(1)
+
+def _start_form_server(components):
+	# A stand-in for the Wodify add performance form. Every response carries a new view state and posts that do not
+	# send back the latest one are rejected, the way that a stale anti-forgery token would be. The fields of every
+	# saved form are kept by their ID so that they can be checked against the results.
+	import threading
+	from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+	from urllib.parse import parse_qs
+	import wodify_http
+
+	fields = [wodify_http.COMPONENT_TYPE, wodify_http.DESCRIPTION, wodify_http.RESULT_TYPE, wodify_http.DATE, wodify_http.REP_SCHEME, wodify_http.SETS, wodify_http.REPS, wodify_http.WEIGHT, wodify_http.COMMENT] + \
+		[wodify_http._RESULT_EDIT + 'wtPerformanceResult_' + field for field in ['Distance', 'DistanceUOM', 'Minutes', 'Seconds', 'Rounds', 'Calories']]
+	options = ''.join(f'<option value="{position}">{name}</option>' for (position, name) in enumerate(components))
+	state = {'version': 0, 'saved': 0, 'rejected': 0, 'posts': []}
+	lock = threading.Lock()
+
+	def form():
+		inputs = ''.join(f'<input type="text" id="{id}" name="{id.replace("_", "$")}" />' for id in fields)
+		selects = ''.join(f'<select id="{id}" name="{id.replace("_", "$")}">{options}</select>' for id in [wodify_http.COMPONENT_NON_METCON, wodify_http.COMPONENT_METCON])
+		return f'<html><body><form method="post"><input type="hidden" name="__OSVSTATE" value="{state["version"]}" />{inputs}{selects}' + \
+			f'<input type="checkbox" id="{wodify_http.PRESCRIBED}" name="{wodify_http.PRESCRIBED.replace("_", "$")}" />' + \
+			f'<input type="submit" id="{wodify_http.SAVE}" name="{wodify_http.SAVE.replace("_", "$")}" value="Save" /></form></body></html>'
+
+	class Handler(BaseHTTPRequestHandler):
+		protocol_version = 'HTTP/1.1'
+		disable_nagle_algorithm = True
+
+		def _respond(self, status):
+			with lock:
+				state['version'] += 1
+				body = form().encode('utf8')
+			self.send_response(status)
+			self.send_header('Content-Type', 'text/html')
+			self.send_header('Content-Length', str(len(body)))
+			self.end_headers()
+			self.wfile.write(body)
+
+		def do_GET(self):
+			self._respond(200)
+
+		def do_POST(self):
+			data = parse_qs(self.rfile.read(int(self.headers['Content-Length'])).decode('utf8'))
+			with lock:
+				accepted = data.get('__OSVSTATE') == [str(state['version'])]
+				state['saved' if accepted else 'rejected'] += 1
+				if (accepted):
+					state['posts'].append(dict((name.replace('$', '_'), values[0]) for (name, values) in data.items() if name != '__OSVSTATE' and name != wodify_http.SAVE.replace('_', '$')))
+			self._respond(200 if accepted else 400)
+
+		def log_message(self, *args):
+			pass
+
+	server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	return (server, state)
+
+# The result type and fields of every kind of metcon measure
+_MEASURE_FIELDS = {
+	'distance': ('8', lambda measure: {'Distance': measure['value'], 'DistanceUOM': int(measure['unit'])}),
+	'time': ('2', lambda measure: {'Minutes': measure['min'], 'Seconds': measure['sec']}),
+	'cal': ('11', lambda measure: {'Calories': measure['value']}),
+	'rounds': ('9', lambda measure: {'Rounds': measure['value']}),
+	'reps': ('3', lambda measure: {'Reps': measure['value']}),
+	'rounds_and_reps': ('4', lambda measure: {'Rounds': measure['rounds'], 'Reps': measure['reps']})
+}
+
+def _expected_form(result, components):
+	# The fields that the add performance form should be posted with for result and whether it falls back to a
+	# Non-Benchmark Metcon. Components are matched by their normalized name and, for non-metcons, without a trailing "s".
+	import wodify_http
+	from wodify_catalog import normalize_component
+	from wodify_data import Metcon
+
+	options = dict((normalize_component(name), str(position)) for (position, name) in enumerate(components))
+	name = normalize_component(result.name)
+	fields = {wodify_http.DATE: result.date}
+	if (result.notes != None and len(result.notes) > 0):
+		fields[wodify_http.COMMENT] = result.notes
+
+	if (isinstance(result, Metcon) == False):
+		component = options.get(name)
+		if (component == None and name.endswith('s')):
+			component = options.get(name[:-1])
+		if (component == None):
+			return (dict(fields, **{wodify_http.COMPONENT_TYPE: '2', wodify_http.COMPONENT_METCON: options[normalize_component('Non-Benchmark Metcon')], wodify_http.DESCRIPTION: result.name, wodify_http.RESULT_TYPE: '6'}), True)
+		fields.update({wodify_http.COMPONENT_TYPE: '1' if isinstance(result, Gymnastics) else '5', wodify_http.COMPONENT_NON_METCON: component, wodify_http.REP_SCHEME: result.name, wodify_http.SETS: result.sets, wodify_http.REPS: result.reps})
+		if (isinstance(result, Weighlifting)):
+			fields[wodify_http.WEIGHT] = result.weight
+		elif (result.prescribed):
+			fields[wodify_http.PRESCRIBED] = 'on'
+		return (dict((id, str(value)) for (id, value) in fields.items()), False)
+
+	fields[wodify_http.COMPONENT_TYPE] = '2'
+	(type, measure) = _MEASURE_FIELDS.get(result.measure['type'], ('6', lambda measure: {})) if result.measure != None else ('6', None)
+	if (measure != None):
+		fields.update((wodify_http._RESULT_EDIT + 'wtPerformanceResult_' + field, value) for (field, value) in measure(result.measure).items())
+		if (result.prescribed):
+			fields[wodify_http.PRESCRIBED] = 'on'
+	component = options.get(name) if result.benchmark else None
+	if (component == None):
+		fields.update({wodify_http.COMPONENT_METCON: options[normalize_component('Non-Benchmark Metcon')], wodify_http.DESCRIPTION: result.name, wodify_http.RESULT_TYPE: type})
+	else:
+		fields[wodify_http.COMPONENT_METCON] = component
+	return (dict((id, str(value)) for (id, value) in fields.items()), result.benchmark and component == None)
+
+def benchmark_http(csvpath, records = 1000):
+	# Imports results with the HTTP engine against a local stand-in of the add performance form and checks the fields
+	# of every form that was saved. Every other component is left out of the form, so that the fallback to a
+	# Non-Benchmark Metcon is checked as well.
+	import requests
+	from itertools import chain, islice
+	from wodify_driver import WodifyDriver
+	from wodify_http import WodifyHttpSession
+
+	results = WorkoutResults.from_bwtb_csv(csvpath)
+	results = list(islice(chain(results.gymnastics, results.weightlifting, results.metcons), records))
+	components = ['Non-Benchmark Metcon'] + sorted(set(r.name for r in results))[::2]
+	(server, state) = _start_form_server(components)
+	try:
+		session = WodifyHttpSession(requests.session(), f'http://127.0.0.1:{server.server_address[1]}/WOD/AddPerformance')
+		print(f'Importing {len(results)} records with the HTTP engine')
+		_measure('import_stream(engine=http)', lambda: WodifyDriver.import_stream(results, driver=session, engine='http') or len(results), label='records')
+		session.quit()
+		print(f'Saved {state["saved"]} forms, rejected {state["rejected"]}')
+	finally:
+		server.shutdown()
+
+	differences = 0
+	fallbacks = 0
+	for (result, posted) in zip(results, state['posts']):
+		(expected, fallback) = _expected_form(result, components)
+		fallbacks += 1 if fallback else 0
+		if (posted != expected):
+			differences += 1
+			if (differences <= 10):
+				print(f'DIFFERENCE [{result.date}] {result.name}:')
+				for id in sorted(set(posted) | set(expected)):
+					if (posted.get(id) != expected.get(id)):
+						print(f'    {id.rsplit("_", 1)[-1]}: posted {posted.get(id)!r}, expected {expected.get(id)!r}')
+	print(f'Checked {min(len(results), len(state["posts"]))} forms, {fallbacks} of them fallbacks to a Non-Benchmark Metcon: {differences} differences')
+	if (differences > 0 or len(state['posts']) != len(results)):
+		sys.exit(1)
+
+def _start_bwtb_server(csvpath, delay, flaky):
+	# A stand-in for the sign in, whiteboard and export pages of beyondthewhiteboard.com. Every flaky-th account fails
+	# its first sign in with a 503 so that retries are exercised.
+	import threading
+	from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+	from urllib.parse import parse_qs
+
+	with open(csvpath, 'rb') as f:
+		content = f.read()
+	failed = set()
+	lock = threading.Lock()
+
+	class Handler(BaseHTTPRequestHandler):
+		protocol_version = 'HTTP/1.1'
+		disable_nagle_algorithm = True
+
+		def _respond(self, status, body = b'', headers = None):
+			self.send_response(status)
+			for (name, value) in (headers or {}).items():
+				self.send_header(name, value)
+			self.send_header('Content-Length', str(len(body)))
+			self.end_headers()
+			self.wfile.write(body)
+
+		def _member(self):
+			cookie = self.headers.get('Cookie') or ''
+			return next((part.split('=', 1)[1] for part in cookie.split('; ') if part.startswith('_btwb_session_id=')), None)
+
+		def do_GET(self):
+			time.sleep(delay / 1000)
+			if (self.path == '/signin'):
+				self._respond(200, b'<html><form><input name="authenticity_token" value="token" /></form></html>')
+			elif (self.path == '/whiteboard'):
+				self._respond(200, f'<html><a class="avatar" href="/members/{self._member()}">me</a></html>'.encode('utf8'))
+			elif (self.path.endswith('/workout_sessions.csv')):
+				if (self.headers.get('If-None-Match') == '"export"'):
+					self._respond(304)
+				else:
+					self._respond(200, content, {'ETag': '"export"', 'Content-Type': 'text/csv'})
+			else:
+				self._respond(404)
+
+		def do_POST(self):
+			time.sleep(delay / 1000)
+			data = parse_qs(self.rfile.read(int(self.headers['Content-Length'])).decode('utf8'))
+			username = data['login'][0]
+			with lock:
+				fail = int(username[len('athlete'):]) % flaky == 0 and username not in failed
+				failed.add(username)
+			if (fail):
+				self._respond(503)
+			elif (data.get('authenticity_token') == ['token']):
+				self._respond(302, headers={'Set-Cookie': f'_btwb_session_id={username}; Path=/', 'Location': '/whiteboard'})
+			else:
+				self._respond(403)
+
+		def log_message(self, *args):
+			pass
+
+	server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+	server.daemon_threads = True
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	return server
+
+def benchmark_export(csvpath, accounts = 100, workers = 16, delay = 20, flaky = 10):
+	# Exports many accounts from a local stand-in of beyondthewhiteboard.com, one at a time and then concurrently
+	import shutil
+	from bwtb_batch_export import Account, export_accounts, FAILED
+
+	server = _start_bwtb_server(csvpath, delay, flaky)
+	base_url = f'http://127.0.0.1:{server.server_address[1]}'
+	directory = tempfile.mkdtemp()
+	try:
+		print(f'Exporting {accounts} accounts with {delay}ms of latency per request')
+		def run(workers, folder):
+			results = export_accounts([Account(f'athlete{i}', 'password', os.path.join(directory, folder, f'athlete{i}.csv')) for i in range(accounts)], workers=workers, base_url=base_url, backoff=0.05)
+			print(f'  {sum(1 for result in results if result.status == FAILED)} failed, {sum(result.attempts for result in results) - len(results)} retries')
+			return len(results)
+		baseline = _measure('export_accounts(workers=1)', lambda: run(1, 'sequential'), label='accounts')
+		parallel = _measure(f'export_accounts(workers={workers})', lambda: run(workers, 'parallel'), label='accounts')
+		_measure(f'export_accounts(workers={workers}) unchanged', lambda: run(workers, 'parallel'), label='accounts')
+		print(f'Speedup: {baseline / parallel:.2f}x')
+	finally:
+		server.shutdown()
+		shutil.rmtree(directory)
+
+def _run_size(csvpath, rows):
+	configure_parse_cache(0)
+	start = time.perf_counter()
+	parsed = sum(1 for _ in parse_workout_csv(csvpath))
+	parseRate = parsed / (time.perf_counter() - start)
+
+	start = time.perf_counter()
+	transformed = len(WorkoutResults.from_bwtb(parse_workout_csv(csvpath)))
+	transformRate = rows / (time.perf_counter() - start)
+
+	(_, _, peak) = _traced_memory(lambda: WorkoutResults.from_bwtb(parse_workout_csv(csvpath)))
+	configure_parse_cache(4096)
+	return {
+		'rows': parsed,
+		'results': transformed,
+		'parse_rows_per_sec': parseRate,
+		'transform_rows_per_sec': transformRate,
+		'peak_bytes': peak
+	}
+
+def _run_workout_types(rows):
+	configure_parse_cache(0)
+	costs = defaultdict(float)
+	counts = defaultdict(int)
+	for row in generate_workout_rows(rows, seed=1):
+		start = time.perf_counter()
+		workout = Workout.parse(row[1], row[9])
+		costs[type(workout).__name__] += time.perf_counter() - start
+		counts[type(workout).__name__] += 1
+	configure_parse_cache(4096)
+	return dict((name, costs[name] / counts[name] * 1000000) for name in sorted(counts))
+
+def _compare(name, current, baseline, higherIsBetter, tolerance = 0.2):
+	if (baseline == None or baseline == 0):
+		return False
+	change = (current - baseline) / baseline
+	regressed = change < -tolerance if higherIsBetter else change > tolerance
+	if (regressed):
+		print(f'REGRESSION {name}: {baseline:.1f} -> {current:.1f} ({change:+.0%})')
+	return regressed
+
+def benchmark_suite(path = 'benchmark.json', *sizes):
+	# Runs against generated exports of each size. The first run is saved to path and later runs are compared to it.
+	sizes = sizes if len(sizes) > 0 else (1000, 10000, 50000)
+	report = {
+		'sizes': {},
+		'workout_types': _run_workout_types(min(sizes))
+	}
+	with tempfile.TemporaryDirectory() as directory:
+		for size in sizes:
+			csvpath = os.path.join(directory, f'workouts-{size}.csv')
+			generate_workout_csv(csvpath, size)
+			result = _run_size(csvpath, size)
+			report['sizes'][str(size)] = result
+			print(f'{size:>8} rows {result["parse_rows_per_sec"]:>10.0f} parsed/sec {result["transform_rows_per_sec"]:>10.0f} transformed/sec {result["peak_bytes"] / 1024 / 1024:>8.1f} MiB peak')
+
+	for (name, cost) in report['workout_types'].items():
+		print(f'{name:<12} {cost:>10.1f} us/workout')
+
+	if (os.path.exists(path) == False):
+		with open(path, 'w+', encoding='utf8', newline=None) as f:
+			json.dump(report, f, indent=4)
+		print('Saved baseline to', path)
+		return
+
+	with open(path, 'r', encoding='utf8', newline=None) as f:
+		baseline = json.load(f)
+
+	regressed = False
+	for (size, result) in report['sizes'].items():
+		previous = baseline['sizes'].get(size, {})
+		regressed |= _compare(f'{size} rows parsed/sec', result['parse_rows_per_sec'], previous.get('parse_rows_per_sec'), True)
+		regressed |= _compare(f'{size} rows transformed/sec', result['transform_rows_per_sec'], previous.get('transform_rows_per_sec'), True)
+		regressed |= _compare(f'{size} rows peak bytes', result['peak_bytes'], previous.get('peak_bytes'), False)
+	for (name, cost) in report['workout_types'].items():
+		regressed |= _compare(f'{name} us/workout', cost, baseline['workout_types'].get(name), False)
+
+	if (regressed):
+		sys.exit(1)
+	print('No regressions against', path)
+
+if __name__ == "__main__":
+	benchmark = 'parse' if (len(sys.argv) <= 1) else sys.argv[1]
+	path = ('benchmark.json' if benchmark == 'suite' else 'workouts.csv') if (len(sys.argv) <= 2) else sys.argv[2]
+	globals()[f'benchmark_{benchmark}'](path, *[int(arg) for arg in sys.argv[3:]])
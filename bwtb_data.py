@@ -1,22 +1,37 @@
 # coding=utf8
 
 import csv
+import functools
+import hashlib
+import json
+import os
+import pickle
 import re
+import sqlite3
+import sys
+import time
 import requests
 from lxml import html
 import datetime
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
-from typing import NamedTuple, List, Union
+from typing import NamedTuple, List, Union, Callable, Any
+from pipeline_metrics import metrics
 
-def get_authenticity_token(session):
-	text = session.get('https://beyondthewhiteboard.com/signin').text
+BASE_URL = 'https://beyondthewhiteboard.com'
+
+def get_authenticity_token(session, base_url: str = BASE_URL):
+	r = session.get(f'{base_url}/signin')
+	r.raise_for_status()
+	text = r.text
 	tree = html.fromstring(text)
 	token = tree.xpath('//input[@name="authenticity_token"]')[0]
 	return token.attrib['value']
 
-def signin(username, password, session):
-	token = get_authenticity_token(session)
-	session.post('https://beyondthewhiteboard.com/session',
+def signin(username, password, session, base_url: str = BASE_URL):
+	token = get_authenticity_token(session, base_url)
+	r = session.post(f'{base_url}/session',
 		headers={'User-Agent': 'Mozilla/5.0'},
 		data={
 			'utf8': '✓',
@@ -25,40 +40,293 @@ def signin(username, password, session):
 			'password': password,
 			'commit': 'Sign In'
 		})
+	r.raise_for_status()
 	if (session.cookies.get('_btwb_session_id') == None):
 		raise Exception('Failed to signin. Check your credentials')
 
-def get_member_id(session):
-	text = session.get('https://beyondthewhiteboard.com/whiteboard').text
+def get_member_id(session, base_url: str = BASE_URL):
+	r = session.get(f'{base_url}/whiteboard')
+	r.raise_for_status()
+	text = r.text
 	tree = html.fromstring(text)
 	avatar = tree.xpath('//a[@class="avatar"]')[0]
 	memberUrl = avatar.attrib['href']
 	return memberUrl[len('/members/'):]
 
-def get_workout_csv(memberId, session):
-	r = session.get(f'https://beyondthewhiteboard.com/members/{memberId}/workout_sessions.csv')
+def _get_workout_csv_url(memberId, base_url: str = BASE_URL):
+	return f'{base_url}/members/{memberId}/workout_sessions.csv'
+
+def get_workout_csv(memberId, session, base_url: str = BASE_URL):
+	r = session.get(_get_workout_csv_url(memberId, base_url))
 	return r.text
 
-def export_workout_csv(memberId, output, session):
+def _get_export_metadata_path(output):
+	return f'{output}.meta'
+
+def _load_export_metadata(output):
+	path = _get_export_metadata_path(output)
+	if (os.path.exists(output) == False or os.path.exists(path) == False):
+		return {}
+	try:
+		with open(path, 'r', encoding='utf8', newline=None) as f:
+			return json.load(f)
+	except:
+		return {}
+
+def _save_export_metadata(output, metadata):
+	path = _get_export_metadata_path(output)
+	with open(path, 'w+', encoding='utf8', newline=None) as f:
+		json.dump(metadata, f)
+
+def _get_conditional_headers(output, metadata):
+	etag = metadata.get('etag')
+	lastModified = metadata.get('last_modified')
+	if (metadata.get('complete') == True):
+		headers = {}
+		if (etag != None):
+			headers['If-None-Match'] = etag
+		if (lastModified != None):
+			headers['If-Modified-Since'] = lastModified
+		return headers
+
+	# A partial download can only be resumed when we can prove that the remote file has not changed since
+	offset = os.path.getsize(output) if os.path.exists(output) else 0
+	validator = etag if etag != None else lastModified
+	if (offset > 0 and validator != None):
+		return {
+			'Range': f'bytes={offset}-',
+			'If-Range': validator
+		}
+	return {}
+
+def _get_range_start(contentRange):
+	# The first byte of a 206 response, e.g. 1234 for 'bytes 1234-5678/5679'
+	match = re.fullmatch(r'bytes\s+(\d+)-\d+/(\d+|\*)', (contentRange or '').strip())
+	return int(match.group(1)) if match != None else None
+
+def stream_workout_csv(memberId, output, session, chunk_size: int = 64 * 1024, base_url: str = BASE_URL) -> bool:
+	metadata = _load_export_metadata(output)
+	headers = _get_conditional_headers(output, metadata)
+	# The bytes on disk are the decoded body, so a resumed download only lines up with them when it is not compressed
+	headers['Accept-Encoding'] = 'identity'
+	with session.get(_get_workout_csv_url(memberId, base_url), headers=headers, stream=True) as r:
+		if (r.status_code == 304):
+			return False
+		if (r.status_code == 416):
+			# The partial file no longer lines up with the remote file so start over
+			os.remove(output)
+			return stream_workout_csv(memberId, output, session, chunk_size, base_url)
+		r.raise_for_status()
+
+		resumed = r.status_code == 206
+		offset = os.path.getsize(output) if os.path.exists(output) else 0
+		if (resumed and _get_range_start(r.headers.get('Content-Range')) != offset):
+			# The server did not resume where the partial file ends so start over
+			if (offset > 0):
+				os.remove(output)
+				return stream_workout_csv(memberId, output, session, chunk_size, base_url)
+			raise Exception(f'Unexpected Content-Range {r.headers.get("Content-Range")} for a download that was not resumed')
+		if (resumed == False):
+			metadata = {
+				'etag': r.headers.get('ETag'),
+				'last_modified': r.headers.get('Last-Modified')
+			}
+		metadata['complete'] = False
+		_save_export_metadata(output, metadata)
+
+		with open(output, 'ab' if resumed else 'wb') as f:
+			for chunk in r.iter_content(chunk_size=chunk_size):
+				f.write(chunk)
+
+	metadata['complete'] = True
+	_save_export_metadata(output, metadata)
+	return True
+
+def export_workout_csv(memberId, output, session, stream: bool = False, base_url: str = BASE_URL):
+	if (stream):
+		return stream_workout_csv(memberId, output, session, base_url=base_url)
+
 	with open(output, 'w+') as f:
-		content = get_workout_csv(memberId, session)
+		content = get_workout_csv(memberId, session, base_url)
 		f.write(content)
 
-def _parse_workout_csv(csvreader):
+	# The validators no longer describe the file on disk
+	metadata = _get_export_metadata_path(output)
+	if (os.path.exists(metadata)):
+		os.remove(metadata)
+	return True
+
+def _get_row_hash(row):
+	return hashlib.sha1('\x1f'.join(row).encode('utf8')).hexdigest()
+
+class WorkoutSnapshot:
+	def __init__(self, path: str, reset: bool = False):
+		self.path = path
+		self.previous = set() if reset else WorkoutSnapshot._load(path)
+		self.current = set()
+
+	@staticmethod
+	def _load(path):
+		if (os.path.exists(path) == False):
+			return set()
+		with open(path, 'r', encoding='utf8', newline=None) as f:
+			return set(line.strip() for line in f if len(line.strip()) > 0)
+
+	def is_new(self, row) -> bool:
+		rowHash = _get_row_hash(row)
+		self.current.add(rowHash)
+		return rowHash not in self.previous
+
+	def save(self):
+		# Only called once the rows have been imported so an interrupted run processes the same delta again
+		temp = f'{self.path}.tmp'
+		with open(temp, 'w+', encoding='utf8', newline=None) as f:
+			for rowHash in sorted(self.current):
+				f.write(f'{rowHash}\n')
+		os.replace(temp, self.path)
+		self.previous = self.current
+		self.current = set()
+
+_rows_read = metrics.counter('bwtb_rows_read_total', 'Rows read from the workout export')
+_rows_unchanged = metrics.counter('bwtb_rows_unchanged_total', 'Rows skipped because they were part of the last import')
+_parse_seconds = metrics.histogram('bwtb_parse_seconds', 'Time spent parsing a workout by workout class')
+
+def _read_workout_rows(csvreader, snapshot: WorkoutSnapshot = None):
 	parsedHeaders = False
 	for row in csvreader:
 		if (parsedHeaders == False):
 			parsedHeaders = True
 			continue
 
-		yield WorkoutResult.from_row(row)
+		_rows_read.inc()
+		if (snapshot != None and snapshot.is_new(row) == False):
+			_rows_unchanged.inc()
+			continue
+
+		yield row
+
+def _read_workout_batches(csvreader, chunksize, snapshot: WorkoutSnapshot = None):
+	batch = []
+	for row in _read_workout_rows(csvreader, snapshot):
+		batch.append(row)
+		if (len(batch) >= chunksize):
+			yield batch
+			batch = []
+
+	if (len(batch) > 0):
+		yield batch
+
+def _parse_workout_csv(csvreader, cache = None, snapshot: WorkoutSnapshot = None):
+	for row in _read_workout_rows(csvreader, snapshot):
+		yield WorkoutResult.from_row(row, cache)
 
-def parse_workout_csv(csvpath):
+def _parse_workout_rows(rows, cache = None):
+	results = [WorkoutResult.from_row(row, cache) for row in rows]
+	if (cache != None):
+		cache.flush()
+	return results
+
+def map_workout_csv(csvpath, handler: Callable[[List[List[str]]], Any], workers: int = None, chunksize: int = 256, snapshot: WorkoutSnapshot = None):
+	# Hands batches of rows to a pool of processes and yields the result of each batch in file order. Only a
+	# couple of batches per worker are in flight at a time so memory does not grow with the size of the file.
 	with open(csvpath, 'r', encoding='utf8', newline=None) as csvfile:
 		reader = csv.reader(csvfile)
-		for result in _parse_workout_csv(reader):
+		workers = workers if workers != None else os.cpu_count()
+		with ProcessPoolExecutor(max_workers=workers) as executor:
+			pending = deque()
+			inflight = workers * 2
+			for batch in _read_workout_batches(reader, chunksize, snapshot):
+				pending.append(executor.submit(handler, batch))
+				if (len(pending) >= inflight):
+					yield pending.popleft().result()
+
+			while (len(pending) > 0):
+				yield pending.popleft().result()
+
+def parse_workout_csv(csvpath, workers: int = None, chunksize: int = 256, cache = None, snapshot: WorkoutSnapshot = None):
+	if (workers == None or workers <= 1):
+		with open(csvpath, 'r', encoding='utf8', newline=None) as csvfile:
+			reader = csv.reader(csvfile)
+			for result in _parse_workout_csv(reader, cache, snapshot):
+				yield result
+		if (cache != None):
+			cache.flush()
+		return
+
+	for results in map_workout_csv(csvpath, functools.partial(_parse_workout_rows, cache=cache), workers=workers, chunksize=chunksize, snapshot=snapshot):
+		for result in results:
 			yield result
 
+class CacheStats(NamedTuple):
+	hits: int
+	misses: int
+	evictions: int
+	size: int
+	maxsize: int
+
+class ParseCache:
+	def __init__(self, maxsize: int = 4096, copy: Callable[[Any], Any] = None):
+		self.maxsize = maxsize
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self._copy = copy
+		self._entries = OrderedDict()
+
+	def get_or_parse(self, key, parse: Callable[[], Any]):
+		if (self.maxsize <= 0):
+			return parse()
+
+		entry = self._entries.get(key, _MISSING)
+		if (entry is _MISSING):
+			self.misses += 1
+			entry = parse()
+			self._entries[key] = entry
+			if (len(self._entries) > self.maxsize):
+				self._entries.popitem(last=False)
+				self.evictions += 1
+		else:
+			self.hits += 1
+			self._entries.move_to_end(key)
+
+		# Hand out a copy so that callers cannot corrupt the cached value
+		return self._copy(entry) if self._copy != None else entry
+
+	def resize(self, maxsize: int):
+		self.maxsize = maxsize
+		while (len(self._entries) > max(maxsize, 0)):
+			self._entries.popitem(last=False)
+			self.evictions += 1
+
+	def clear(self):
+		self._entries.clear()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def stats(self) -> CacheStats:
+		return CacheStats(hits=self.hits, misses=self.misses, evictions=self.evictions, size=len(self._entries), maxsize=self.maxsize)
+
+_MISSING = object()
+
+def _copy_movement(movement):
+	# Measurements are immutable so only the list of performed measurements needs to be copied
+	return movement._replace(performed=list(movement.performed)) if movement.performed != None else movement
+
+_measurement_cache = ParseCache()
+_movement_cache = ParseCache(copy=_copy_movement)
+
+def configure_parse_cache(maxsize: int):
+	# A maxsize of 0 turns caching off
+	_measurement_cache.resize(maxsize)
+	_movement_cache.resize(maxsize)
+
+def parse_cache_stats():
+	return {
+		'measurement': _measurement_cache.stats(),
+		'movement': _movement_cache.stats()
+	}
+
 class MeasurementUnit(str, Enum):
 	REPS = 'reps',
 	ROUNDS = 'rounds',
@@ -71,10 +339,73 @@ class MeasurementUnit(str, Enum):
 	POUNDS = 'lb',
 	KILOGRAMS = 'kg'
 
+# Maps every spelling of a unit that shows up in an export to the unit that it is stored as and the factor
+# that converts the value into that unit. Rep maxes ('1rm', '3rm', ...) are matched by their 'rm' suffix.
+_UNIT_ALIASES = {
+	'sec': (MeasurementUnit.SECONDS, 1.0),
+	'secs': (MeasurementUnit.SECONDS, 1.0),
+	's': (MeasurementUnit.SECONDS, 1.0),
+	'min': (MeasurementUnit.SECONDS, 60.0),
+	'mins': (MeasurementUnit.SECONDS, 60.0),
+	'kg': (MeasurementUnit.KILOGRAMS, 1.0),
+	'pood': (MeasurementUnit.KILOGRAMS, 16),
+	'cal': (MeasurementUnit.CALORIES, 1.0),
+	'cals': (MeasurementUnit.CALORIES, 1.0),
+	'in': (MeasurementUnit.INCHES, 1.0),
+	'ft': (MeasurementUnit.FEET, 1.0),
+	'f': (MeasurementUnit.FEET, 1.0),
+	'mi': (MeasurementUnit.MILES, 1.0),
+	'm': (MeasurementUnit.METERS, 1.0),
+	'km': (MeasurementUnit.METERS, 1000.0),
+	'lb': (MeasurementUnit.POUNDS, 1.0),
+	'lbs': (MeasurementUnit.POUNDS, 1.0),
+	'rep': (MeasurementUnit.REPS, 1.0),
+	'reps': (MeasurementUnit.REPS, 1.0),
+	'round': (MeasurementUnit.ROUNDS, 1.0),
+	'rounds': (MeasurementUnit.ROUNDS, 1.0)
+}
+
+# Qualifiers that can trail a unit without changing it, e.g. '24 kg each' or '15 cal per station'
+_UNIT_QUALIFIERS = re.compile(r'(.*?)(?: per station)?(?: each)?', re.DOTALL)
+
+_MAX_SHARED = 65536
+
 class Measurement:
-	def __init__(self, value, unit):
-		self.value = value
-		self.unit = unit
+	# Measurements are immutable values so instances of the same value are shared instead of being allocated for
+	# every movement that uses them. Only the first _MAX_SHARED distinct values are kept.
+	__slots__ = ('value', 'unit')
+	_shared = {}
+
+	def __new__(cls, value, unit):
+		# 'reps' and MeasurementUnit.REPS are equal and hash the same, so the unit is always stored as a member for the
+		# shared instance to be the same whichever of them it was first made with
+		unit = MeasurementUnit(unit)
+		key = (type(value), value, unit)
+		measurement = Measurement._shared.get(key)
+		if (measurement == None):
+			measurement = object.__new__(cls)
+			object.__setattr__(measurement, 'value', value)
+			object.__setattr__(measurement, 'unit', unit)
+			if (len(Measurement._shared) < _MAX_SHARED):
+				Measurement._shared[key] = measurement
+		return measurement
+
+	def __setattr__(self, name, value):
+		raise AttributeError('Measurement is immutable')
+
+	def __delattr__(self, name):
+		raise AttributeError('Measurement is immutable')
+
+	def __reduce__(self):
+		return (Measurement, (self.value, self.unit))
+
+	def __eq__(self, other):
+		if (isinstance(other, Measurement) == False):
+			return NotImplemented
+		return self.value == other.value and self.unit == other.unit
+
+	def __hash__(self):
+		return hash((self.value, self.unit))
 
 	def __repr__(self):
 		return f'MeasurementUnit({self.value}, {self.unit})'
@@ -104,6 +435,10 @@ class Measurement:
 
 	@staticmethod
 	def _parse(text, defaultUnit = None):
+		return _measurement_cache.get_or_parse((text, defaultUnit), lambda: Measurement._parse_uncached(text, defaultUnit))
+
+	@staticmethod
+	def _parse_uncached(text, defaultUnit = None):
 		text = Measurement._normalize(text)
 		result = Measurement._parse_specialcase(text)
 		if (result == None):
@@ -116,52 +451,12 @@ class Measurement:
 
 	@staticmethod
 	def _parse_unit_and_factor(value):
-		if (value.endswith(' each')):
-			value = value[0:len(value) - len(' each')]
-
-		if (value.endswith(' per station')):
-			value = value[0:len(value) - len(' per station')]
-
-		value = value.lower()
-		if (value == 'sec' or value == 'secs' or value == 's'):
-			return (MeasurementUnit.SECONDS, 1.0)
-
-		if (value == 'min' or value == 'mins'):
-			return (MeasurementUnit.SECONDS, 60.0)
-
-		if (value == 'kg'):
-			return (MeasurementUnit.KILOGRAMS, 1.0)
-
-		if (value == 'pood'):
-			return (MeasurementUnit.KILOGRAMS, 16)
-
-		if (value == 'cal' or value == 'cals'):
-			return (MeasurementUnit.CALORIES, 1.0)
-
-		if (value == 'in'):
-			return (MeasurementUnit.INCHES, 1.0)
-
-		if (value == 'ft' or value == 'f'):
-			return (MeasurementUnit.FEET, 1.0)
-
-		if (value == 'mi'):
-			return (MeasurementUnit.MILES, 1.0)
-
-		if (value == 'm'):
-			return (MeasurementUnit.METERS, 1.0)
-
-		if (value == 'km'):
-			return (MeasurementUnit.METERS, 1000.0)
-
-		if (value == 'lb' or value == 'lbs'):
-			return (MeasurementUnit.POUNDS, 1.0)
-
-		if (value == 'rep' or value == 'reps' or value.endswith('rm')):
+		value = _UNIT_QUALIFIERS.fullmatch(value).group(1).lower()
+		unit = _UNIT_ALIASES.get(value)
+		if (unit != None):
+			return unit
+		if (value.endswith('rm')):
 			return (MeasurementUnit.REPS, 1.0)
-
-		if (value == 'round' or value == 'rounds'):
-			return (MeasurementUnit.ROUNDS, 1.0)
-
 		return (None, 0.0)
 
 	@staticmethod
@@ -229,6 +524,21 @@ class Measurement:
 		
 		return None
 
+# The load of a movement ends at the next comma or pipe
+_FIELD_SEPARATORS = re.compile('[,|]')
+# What int() accepts in base 10
+_INT_LITERAL = re.compile(r'\s*[+-]?\d+(?:_\d+)*\s*')
+_UNDECIDED = object()
+
+def _get_rep_count(token: str) -> int:
+	# The rep count that leads a movement or None when int() would not accept the token. int() refuses more than 4300
+	# digits, which is left to the legacy parser as _UNDECIDED.
+	if (len(token) > 4300):
+		return _UNDECIDED
+	if (token.isdecimal() or _INT_LITERAL.fullmatch(token) != None):
+		return int(token)
+	return None
+
 class Movement(NamedTuple):
 	summary: str
 	description: str
@@ -237,6 +547,78 @@ class Movement(NamedTuple):
 
 	@staticmethod
 	def parse(description):
+		return _movement_cache.get_or_parse(description, lambda: Movement._parse_uncached(description))
+
+	@staticmethod
+	def _parse_uncached(description):
+		movement = Movement._parse_grammar(description)
+		if (movement is _UNDECIDED):
+			movement = Movement._parse_legacy(description)
+		return movement
+
+	@staticmethod
+	def _parse_grammar(description):
+		# Recognises the same forms as _parse_legacy without raising on the way: rest, "N movement, load | performed",
+		# "movement, load | performed", "N movement | performed", "movement | performed" and "N movement". Lines
+		# that only the legacy parser can decide return _UNDECIDED.
+		description = description.replace('Box, Bands', 'Box/Bands').strip()
+
+		if (description[:8].lower().startswith(('rest ', 'resting '))):
+			assigned = description.replace(' in between ', ' between ').split(' ', 1)[1].split(' between ')[0]
+			return Movement('Rest', description, Measurement.parse(assigned))
+
+		if (', ' in description):
+			(name, _, assigned) = description.partition(',')
+			name = name.strip()
+			assigned = assigned.strip()
+			reps = _get_rep_count(name.partition(' ')[0])
+			if (reps is _UNDECIDED):
+				return _UNDECIDED
+			if (reps != None):
+				try:
+					performed = Measurement.parse_list(assigned.partition(',')[0].rpartition('|')[2])
+				except:
+					# The legacy parser falls back to reading the load when the performed measurements do not parse
+					return _UNDECIDED
+				return Movement(sys.intern(name), description, Measurement(reps, MeasurementUnit.REPS), performed)
+
+			performed = None
+			(load, separator, rest) = assigned.partition(':')
+			if (separator == ''):
+				(load, separator, rest) = assigned.partition('|')
+			if (separator != ''):
+				assigned = load.strip()
+				performed = Measurement.parse_list(rest.partition(separator)[0].strip())
+			assigned = Measurement.parse(_FIELD_SEPARATORS.split(assigned, 1)[0].strip())
+			return Movement(sys.intern(name), description, assigned, performed)
+
+		if ('|' in description):
+			(movement, _, performed) = description.partition('|')
+			movement = movement.strip()
+			performed = Measurement.parse_list(performed.strip())
+			(reps, space, name) = movement.partition(' ')
+			count = _get_rep_count(reps.strip())
+			if (count is _UNDECIDED):
+				return _UNDECIDED
+			if (count == None):
+				assigned = performed[0] if (performed != None and len(performed) > 0) else Measurement(0, MeasurementUnit.REPS)
+				name = movement
+			else:
+				assigned = Measurement(count, MeasurementUnit.REPS)
+				if (space == ''):
+					name = movement
+			return Movement(sys.intern(name), description, assigned, performed)
+
+		(reps, _, name) = description.partition(' ')
+		count = _get_rep_count(reps.strip())
+		if (count is _UNDECIDED):
+			return _UNDECIDED
+		if (count == None or name == ''):
+			return Movement(sys.intern(description), description, None)
+		return Movement(sys.intern(name.strip()), description, Measurement(count, MeasurementUnit.REPS))
+
+	@staticmethod
+	def _parse_legacy(description):
 		description = description.replace('Box, Bands', 'Box/Bands').strip()
 
 		if (description.lower().startswith('rest ') or description.lower().startswith('resting ')):
@@ -264,7 +646,7 @@ class Movement(NamedTuple):
 					performed = Measurement.parse_list(parts[1])
 				assigned = Measurement.parse(re.split('[,|]', assigned)[0].strip())
 
-			return Movement(summary=name, description=description, assigned=assigned, performed=performed)
+			return Movement(summary=sys.intern(name), description=description, assigned=assigned, performed=performed)
 		elif ('|' in description):
 			parts = [part.strip() for part in description.split('|', 1)]
 			movement = parts[0]
@@ -279,7 +661,7 @@ class Movement(NamedTuple):
 				assigned = performed[0] if (performed != None and len(performed) > 0) else Measurement(0, MeasurementUnit.REPS)
 				name = movement
 
-			return Movement(summary=name, description=description, assigned=assigned, performed=performed)
+			return Movement(summary=sys.intern(name), description=description, assigned=assigned, performed=performed)
 		else:
 			parts = [part.strip() for part in description.split(' ', 1)]
 			try:
@@ -289,7 +671,7 @@ class Movement(NamedTuple):
 				assigned = None
 				name = description
 
-			return Movement(summary=name, description=description, assigned=assigned)
+			return Movement(summary=sys.intern(name), description=description, assigned=assigned)
 
 class RepScheme(NamedTuple):
 	summary: str
@@ -490,6 +872,77 @@ class Workout:
 
 		return Rounds.parse(summary, description)
 
+def _get_parser_version():
+	# Any change to the parser changes this module so its contents double as the version of the parser
+	with open(__file__, 'rb') as f:
+		return hashlib.sha1(f.read()).hexdigest()
+
+class WorkoutCache:
+	def __init__(self, path: str = '.parsecache', version: str = None, batch: int = 500):
+		self.path = path
+		self.version = version if version != None else _get_parser_version()
+		self.batch = batch
+		self._connection = None
+		self._pending = []
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def __getstate__(self):
+		# Each process opens its own connection to the cache
+		return {
+			'path': self.path,
+			'version': self.version,
+			'batch': self.batch
+		}
+
+	def __setstate__(self, state):
+		self.__init__(**state)
+
+	def _connect(self):
+		if (self._connection == None):
+			# The cache may be opened on the thread that parses and closed by the one that created it
+			self._connection = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+			self._connection.execute('CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)')
+			self._connection.execute('CREATE TABLE IF NOT EXISTS workouts (key TEXT PRIMARY KEY, workout BLOB)')
+			row = self._connection.execute('SELECT value FROM metadata WHERE name = ?', ('version',)).fetchone()
+			if (row == None or row[0] != self.version):
+				with self._connection:
+					self._connection.execute('DELETE FROM workouts')
+					self._connection.execute('INSERT OR REPLACE INTO metadata (name, value) VALUES (?, ?)', ('version', self.version))
+		return self._connection
+
+	def _get_key(self, summary, description):
+		return hashlib.sha1(f'{self.version}\0{summary}\0{description}'.encode('utf8')).hexdigest()
+
+	def parse(self, summary, description):
+		connection = self._connect()
+		key = self._get_key(summary, description)
+		row = connection.execute('SELECT workout FROM workouts WHERE key = ?', (key,)).fetchone()
+		if (row != None):
+			return pickle.loads(row[0])
+
+		workout = Workout.parse(summary, description)
+		self._pending.append((key, pickle.dumps(workout, pickle.HIGHEST_PROTOCOL)))
+		if (len(self._pending) >= self.batch):
+			self.flush()
+		return workout
+
+	def flush(self):
+		if (len(self._pending) > 0):
+			with self._connect() as connection:
+				connection.executemany('INSERT OR REPLACE INTO workouts (key, workout) VALUES (?, ?)', self._pending)
+			self._pending = []
+
+	def close(self):
+		if (self._connection != None):
+			self.flush()
+			self._connection.close()
+			self._connection = None
+
 class WorkoutResult(NamedTuple):
 	date: datetime.datetime
 	workout: Union[Sections, Sets, EMOM, AMRAP, Tabata, ForTime, Rounds]
@@ -503,10 +956,20 @@ class WorkoutResult(NamedTuple):
 		return datetime.datetime(int(d[0:4]), int(d[5:7]), int(d[8:10]))
 
 	@staticmethod
-	def from_row(row):
+	def _parse_workout(row, cache: WorkoutCache = None):
+		if (metrics.enabled == False):
+			return cache.parse(row[1], row[9]) if cache != None else Workout.parse(row[1], row[9])
+
+		start = time.perf_counter()
+		workout = cache.parse(row[1], row[9]) if cache != None else Workout.parse(row[1], row[9])
+		_parse_seconds.observe(time.perf_counter() - start, workout=type(workout).__name__)
+		return workout
+
+	@staticmethod
+	def from_row(row, cache: WorkoutCache = None):
 		return WorkoutResult( \
 			date=WorkoutResult._parse_date(row[0]), \
-			workout=Workout.parse(row[1], row[9]), \
+			workout=WorkoutResult._parse_workout(row, cache), \
 			results=Measurement.parse_list(row[7].split('|')[0] if len(row[7]) > 0 else None), \
 			prescribed=row[3] == 'true', \
 			puked=row[4] == 'true', \
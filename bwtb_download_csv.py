@@ -10,5 +10,7 @@ if __name__ == "__main__":
 	with requests.session() as s:
 		signin(sys.argv[1], sys.argv[2], s)
 		memberId = get_member_id(s)
-		export_workout_csv(memberId, output, s)
-		print('Downloaded workouts to', output)
+		if (export_workout_csv(memberId, output, s, stream=True)):
+			print('Downloaded workouts to', output)
+		else:
+			print('Workouts in', output, 'are already up to date')
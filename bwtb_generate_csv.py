@@ -0,0 +1,150 @@
+import csv
+import datetime
+import random
+from typing import Dict, Iterator, List
+
+HEADERS = ['Date', 'Workout', 'Workout Type', 'Prescribed', 'Puked', 'Personal Record', 'Score', 'Result', 'Notes', 'Description']
+
+WORKOUT_TYPES = ['sets', 'gymnastics', 'emom', 'amrap', 'tabata', 'fortime', 'sections', 'rounds']
+
+DEFAULT_MIX = {
+	'sets': 4,
+	'gymnastics': 1,
+	'emom': 1,
+	'amrap': 2,
+	'tabata': 1,
+	'fortime': 2,
+	'sections': 1,
+	'rounds': 3
+}
+
+_LIFTS = ['Back Squat', 'Front Squat', 'Deadlift', 'Shoulder Press', 'Push Press', 'Bench Press', 'Power Clean', 'Squat Snatch', 'Clean and Jerk', 'Thruster']
+_BODYWEIGHT = ['Pull-ups', 'Push-ups', 'Air Squats', 'Sit-ups', 'Burpees', 'Box Jumps', 'Toes-to-bar', 'Handstand Push-ups', 'Double-unders', 'Ring Dips']
+_LOADED = [('Kettlebell Swings', ['1 pood', '1.5 pood', '24 kg', '16 kg each']), ('Wall-ball Shots', ['20 lb', '14 lb']), ('Dumbbell Snatches', ['50 lb each', '35 lb each']), ('Thrusters', ['95 lb', '65 lb']), ('Box Jumps', ['24 in', '20 in'])]
+_MONOSTRUCTURAL = [('Run', ['200 m', '400 m', '800 m', '1 mi', '1 km']), ('Row', ['500 m', '1000 m', '15 cal', '20 cal per station']), ('Assault Bike', ['10 cal', '15 cal each'])]
+_RESTS = ['Rest 1 min', 'Rest 2 mins', 'Rest 90 secs', 'Rest 30 sec between rounds', 'Resting 3 mins in between sets']
+
+def _weight(rng: random.Random, low: int = 45, high: int = 315) -> int:
+	return rng.randrange(low, high, 5)
+
+def _time(rng: random.Random, low: int = 120, high: int = 1800) -> str:
+	seconds = rng.randint(low, high)
+	if (seconds >= 3600):
+		return f'{seconds // 3600}:{(seconds % 3600) // 60:02}:{seconds % 60:02}'
+	return f'{seconds // 60}:{seconds % 60:02}'
+
+def _movement(rng: random.Random) -> str:
+	kind = rng.random()
+	if (kind < 0.35):
+		return f'{rng.choice([5, 10, 12, 15, 20, 21, 30])} {rng.choice(_BODYWEIGHT)}'
+	if (kind < 0.7):
+		(name, loads) = rng.choice(_LOADED)
+		return f'{rng.choice([10, 12, 15, 21])} {name}, {rng.choice(loads)}'
+	(name, distances) = rng.choice(_MONOSTRUCTURAL)
+	return f'{name}, {rng.choice(distances)}'
+
+def _movements(rng: random.Random, low: int = 2, high: int = 4) -> List[str]:
+	return [_movement(rng) for _ in range(rng.randint(low, high))]
+
+def _sets(rng: random.Random):
+	lift = rng.choice(_LIFTS)
+	reps = rng.choice([1, 2, 3, 5])
+	weight = _weight(rng, 95, 275)
+	lines = []
+	for _ in range(rng.randint(3, 6)):
+		lines.append(f'{reps} {lift}, {weight} lb | {weight} lb')
+		weight += rng.choice([0, 5, 10, 20])
+	return (lift, '\n'.join(['Sets'] + lines), f'{weight} lb')
+
+def _gymnastics(rng: random.Random):
+	movement = rng.choice(_BODYWEIGHT)
+	reps = rng.choice([5, 8, 10, 15])
+	lines = [f'{reps} {movement}' for _ in range(rng.randint(3, 5))]
+	return (movement, '\n'.join(['Sets'] + lines), '')
+
+def _emom(rng: random.Random):
+	interval = rng.choice(['1 min', '2 mins', '90 secs'])
+	total = rng.choice(['10 mins', '12 mins', '20 mins'])
+	lift = rng.choice(_LIFTS)
+	reps = rng.choice([1, 2, 3])
+	weight = _weight(rng, 95, 225)
+	if (rng.random() < 0.3):
+		header = f'Every {interval} for {total}, alternating between:'
+		lines = [f'{reps} {lift}, {weight} lb | {weight} lb', _movement(rng)]
+	else:
+		header = f'Every {interval} for {total}'
+		lines = [f'{reps} {lift}, {weight} lb | {weight} lb']
+	return (f'EMOM {total}', '\n'.join([header] + lines), '')
+
+def _amrap(rng: random.Random):
+	minutes = rng.choice([7, 12, 15, 20])
+	rounds = rng.randint(3, 25)
+	return (rng.choice(['Cindy', 'Mary', 'Nicole', f'AMRAP {minutes}']), '\n'.join([f'{minutes} min AMRAP'] + _movements(rng)), f'{rounds} rounds + {rng.randint(0, 20)} reps|')
+
+def _tabata(rng: random.Random):
+	movement = rng.choice(_BODYWEIGHT)
+	return (f'"Tabata" {movement} 8 x 20 sec/10 sec', movement, f'{rng.randint(60, 200)} reps|')
+
+def _fortime(rng: random.Random):
+	(name, loads) = rng.choice(_LOADED)
+	load = loads[0].split(' ')
+	scheme = rng.choice(['21-15-9', '15-12-9', '10-9-8-7-6-5-4-3-2-1', '5-4-3-2-1'])
+	description = '\n'.join([f'{scheme} reps of:', f'{load[0]} {load[1]} {name}', rng.choice(_BODYWEIGHT)])
+	return (rng.choice(['Fran', 'Diane', 'Elizabeth', 'Grace']), description, f'{_time(rng)}|')
+
+def _rounds(rng: random.Random):
+	rounds = rng.randint(2, 10)
+	lines = _movements(rng)
+	if (rng.random() < 0.3):
+		lines.append(rng.choice(_RESTS))
+	if (rng.random() < 0.2):
+		return (rng.choice(['Intervals', 'Conditioning']), '\n'.join(['Intervals'] + lines), f'{_time(rng)}|')
+	return (rng.choice(['Helen', 'Kelly', 'Nancy', 'Jackie']), '\n'.join([f'{rounds} rounds for time of:'] + lines), f'{_time(rng)}|')
+
+def _sections(rng: random.Random):
+	(_, strength, _) = _sets(rng)
+	(_, metcon, result) = _rounds(rng)
+	return ('Strength and Conditioning', f'{strength}\nthen \n{metcon}', result)
+
+_GENERATORS = {
+	'sets': _sets,
+	'gymnastics': _gymnastics,
+	'emom': _emom,
+	'amrap': _amrap,
+	'tabata': _tabata,
+	'fortime': _fortime,
+	'sections': _sections,
+	'rounds': _rounds
+}
+
+def generate_workout_rows(rows: int, seed: int = 0, mix: Dict[str, int] = None) -> Iterator[List[str]]:
+	# The same rows, seed and mix always produce the same rows
+	rng = random.Random(seed)
+	mix = mix if mix != None else DEFAULT_MIX
+	types = [t for t in WORKOUT_TYPES if mix.get(t, 0) > 0]
+	weights = [mix[t] for t in types]
+	date = datetime.date(2012, 1, 1)
+	for _ in range(rows):
+		date += datetime.timedelta(days=rng.randint(0, 2))
+		(summary, description, result) = _GENERATORS[rng.choices(types, weights)[0]](rng)
+		notes = rng.choice(['', '', '', 'Felt good', 'Scaled the load', 'New PR!'])
+		yield [date.isoformat(), summary, '', 'true' if rng.random() < 0.7 else 'false', 'true' if rng.random() < 0.02 else 'false', '', '', result, notes, description]
+
+def generate_workout_csv(output: str, rows: int, seed: int = 0, mix: Dict[str, int] = None):
+	with open(output, 'w+', encoding='utf8', newline='') as f:
+		writer = csv.writer(f)
+		writer.writerow(HEADERS)
+		writer.writerows(generate_workout_rows(rows, seed, mix))
+
+def parse_mix(text: str) -> Dict[str, int]:
+	return dict((name.strip(), int(weight)) for (name, weight) in (part.split('=') for part in text.split(',')))
+
+if __name__ == "__main__":
+	import sys
+
+	output = 'workouts.csv' if (len(sys.argv) <= 1) else sys.argv[1]
+	rows = 1000 if (len(sys.argv) <= 2) else int(sys.argv[2])
+	seed = 0 if (len(sys.argv) <= 3) else int(sys.argv[3])
+	mix = None if (len(sys.argv) <= 4) else parse_mix(sys.argv[4])
+	generate_workout_csv(output, rows, seed, mix)
+	print(f'Generated {rows} workouts to', output)
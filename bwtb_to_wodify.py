@@ -1,37 +1,96 @@
 #!/usr/bin/env python
 
 import sys
+from itertools import chain
 from os import path
 from getpass import getpass
 import requests
-from bwtb_data import signin, get_member_id, export_workout_csv, parse_workout_csv
+from bwtb_data import signin, get_member_id, export_workout_csv, parse_workout_csv, WorkoutCache, WorkoutSnapshot
 from wodify_data import WorkoutResults
-from wodify_driver import WodifyDriver
+from wodify_driver import WodifyDriver, configure_browser, wait_latency_report
+from wodify_ledger import ImportLedger, DeadLetters
+from wodify_pipeline import import_pipelined
+from pipeline_metrics import metrics
 
 print('This script will walk you through migrating your workout results from beyondthewhiteboard.com. You will need your beyondthewhiteboard.com username and password as well as your wodify.com username and password.')
 print('')
 
 bwtbout = 'workouts.csv'
-if (path.exists(bwtbout)):
+sync = '--sync' in sys.argv[1:]
+pipeline = '--pipeline' in sys.argv[1:]
+workers = next((int(arg.split('=', 1)[1]) for arg in sys.argv[1:] if arg.startswith('--workers=')), 1)
+engine = next((arg.split('=', 1)[1] for arg in sys.argv[1:] if arg.startswith('--engine=')), 'browser')
+configure_browser(headless='--headless' in sys.argv[1:])
+metricspaths = ['metrics.json', 'metrics.prom']
+if ('--metrics' in sys.argv[1:]):
+	metrics.enable()
+	metrics.start_periodic_dump(metricspaths)
+
+def download(bwtbuser, bwtbpass):
+	print('Downloading your workouts results from beyondthewhiteboard.com')
+	with requests.session() as s:
+		signin(bwtbuser, bwtbpass, s)
+		memberId = get_member_id(s)
+		if (export_workout_csv(memberId, bwtbout, s, stream=True)):
+			print('Downloaded workouts to', bwtbout)
+		else:
+			print('Your workouts have not changed since they were last downloaded.')
+
+def print_import_summary(deadletters):
+	if (len(deadletters) > 0):
+		print(f'{len(deadletters)} results could not be imported and were saved to {deadletters.path}. They can be imported again with wodify_import.py.')
+
+	print('')
+	print('Wodify response times:')
+	for stats in sorted(wait_latency_report(), key=lambda stats: stats.p95, reverse=True):
+		print(f'  {stats.locator[-60:]:<60} {stats.count:>6} waits  p50 {stats.p50:.2f}s  p95 {stats.p95:.2f}s  timeout {stats.timeout:.1f}s  {stats.timeouts} timed out')
+
+bwtbuser = None
+if (path.exists(bwtbout) and sync == False):
 	print('Your workouts have already been downloaded and will not be downloaded again.')
 else:
 	bwtbuser = input('Enter your beyondthewhiteboard.com username: ')
 	bwtbpass = getpass()
 	print('')
-	print('Downloading your workouts results from beyondthewhiteboard.com')
-	with requests.session() as s:
-		signin(bwtbuser, bwtbpass, s)
-		memberId = get_member_id(s)
-		export_workout_csv(memberId, bwtbout, s)
-		print('Downloaded workouts to', bwtbout)
 
-wodifyuser = input('Enter your app.wodify.com username: ')
-wodifypass = getpass()
+# Only the rows that were not part of the last import are processed when syncing
+snapshot = WorkoutSnapshot(f'{bwtbout}.snapshot', reset=(sync == False))
+deadletters = DeadLetters('.deadletters.ndjson')
+
+if (pipeline):
+	# Every stage runs at once so all of the credentials are needed up front
+	wodifyuser = input('Enter your app.wodify.com username: ')
+	wodifypass = getpass()
+
+	with WorkoutCache('.parsecache') as cache, ImportLedger('.ledger') as ledger:
+		imported = import_pipelined(bwtbout, download=(lambda: download(bwtbuser, bwtbpass)) if bwtbuser != None else None, workers=workers, cache=cache, snapshot=snapshot, username=wodifyuser, password=wodifypass, ledger=ledger, deadletters=deadletters, onimport=lambda name: print(f'Imported {name}'), engine=engine)
+	print(f'Imported {imported} workout results into Wodify.')
+	print_import_summary(deadletters)
+else:
+	if (bwtbuser != None):
+		download(bwtbuser, bwtbpass)
+
+	with WorkoutCache('.parsecache') as cache:
+		wodifyresults=WorkoutResults.from_bwtb(parse_workout_csv(bwtbout, cache=cache, snapshot=snapshot))
+	print(f'Found {len(wodifyresults)} workout results to import into Wodify.')
+
+	if (len(wodifyresults) > 0):
+		wodifyuser = input('Enter your app.wodify.com username: ')
+		wodifypass = getpass()
+
+		# Results that are already in the ledger were imported by an earlier run and are skipped
+		with ImportLedger('.ledger') as ledger:
+			if (workers > 1):
+				WodifyDriver.import_parallel(chain(wodifyresults.gymnastics, wodifyresults.weightlifting, wodifyresults.metcons), workers=workers, username=wodifyuser, password=wodifypass, ledger=ledger, deadletters=deadletters, onimport=lambda name: print(f'Imported {name}'), engine=engine)
+			else:
+				WodifyDriver.import_all(wodifyresults, username=wodifyuser, password=wodifypass, ledger=ledger, deadletters=deadletters, onimport=lambda name: print(f'Imported {name}'), engine=engine)
 
-wodifyresults=WorkoutResults.from_bwtb(parse_workout_csv(bwtbout))
-print(f'Found {len(wodifyresults)} workout results to import into Wodify.')
+		print_import_summary(deadletters)
 
-resumetoken = WodifyDriver.load_resume_token('.resume')
-trackresumetoken = WodifyDriver.track_resume_token('.resume')
+snapshot.save()
 
-WodifyDriver.import_all(wodifyresults, username=wodifyuser, password=wodifypass, onimport=lambda name: print(f'Imported {name}'), resumetoken=resumetoken, onresumetokenupdated=trackresumetoken)
+if (metrics.enabled):
+	metrics.stop_periodic_dump()
+	for metricspath in metricspaths:
+		metrics.dump(metricspath)
+	print('Saved metrics to', ', '.join(metricspaths))
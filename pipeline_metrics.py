@@ -0,0 +1,198 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0)
+
+def _get_key(labels: Dict[str, str]) -> Tuple:
+	return tuple(sorted(labels.items()))
+
+def _format_labels(key: Tuple, extra: Dict[str, str] = None) -> str:
+	pairs = list(key) + (list(extra.items()) if extra != None else [])
+	if (len(pairs) == 0):
+		return ''
+	return '{' + ','.join(f'{name}="{value}"' for (name, value) in pairs) + '}'
+
+class _NullTimer:
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		pass
+
+_NULL_TIMER = _NullTimer()
+
+class _Timer:
+	def __init__(self, histogram: 'Histogram', labels: Dict[str, str]):
+		self._histogram = histogram
+		self._labels = labels
+
+	def __enter__(self):
+		self._start = time.perf_counter()
+		return self
+
+	def __exit__(self, *args):
+		self._histogram.observe(time.perf_counter() - self._start, **self._labels)
+
+class Counter:
+	def __init__(self, registry: 'MetricsRegistry', name: str, help: str):
+		self.name = name
+		self.help = help
+		self._registry = registry
+		self._values = {}
+		self._lock = threading.Lock()
+
+	def inc(self, amount: float = 1, **labels):
+		if (self._registry.enabled == False):
+			return
+
+		key = _get_key(labels)
+		with self._lock:
+			self._values[key] = self._values.get(key, 0) + amount
+
+	def _snapshot(self):
+		with self._lock:
+			return [{'labels': dict(key), 'value': value} for (key, value) in self._values.items()]
+
+	def _prometheus(self) -> List[str]:
+		lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+		with self._lock:
+			for (key, value) in self._values.items():
+				lines.append(f'{self.name}{_format_labels(key)} {value}')
+		return lines
+
+	def _reset(self):
+		with self._lock:
+			self._values.clear()
+
+class Histogram:
+	def __init__(self, registry: 'MetricsRegistry', name: str, help: str, buckets: Tuple[float] = DEFAULT_BUCKETS):
+		self.name = name
+		self.help = help
+		self.buckets = tuple(sorted(buckets))
+		self._registry = registry
+		self._values = {}
+		self._lock = threading.Lock()
+
+	def observe(self, value: float, **labels):
+		if (self._registry.enabled == False):
+			return
+
+		key = _get_key(labels)
+		with self._lock:
+			entry = self._values.get(key)
+			if (entry == None):
+				entry = [[0] * (len(self.buckets) + 1), 0.0, 0]
+				self._values[key] = entry
+			entry[0][bisect_left(self.buckets, value)] += 1
+			entry[1] += value
+			entry[2] += 1
+
+	def time(self, **labels):
+		if (self._registry.enabled == False):
+			return _NULL_TIMER
+		return _Timer(self, labels)
+
+	def _cumulative(self, counts: List[int]) -> List[int]:
+		total = 0
+		cumulative = []
+		for count in counts:
+			total += count
+			cumulative.append(total)
+		return cumulative
+
+	def _snapshot(self):
+		with self._lock:
+			return [{
+				'labels': dict(key),
+				'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], self._cumulative(counts))),
+				'sum': total,
+				'count': count
+			} for (key, (counts, total, count)) in self._values.items()]
+
+	def _prometheus(self) -> List[str]:
+		lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+		with self._lock:
+			for (key, (counts, total, count)) in self._values.items():
+				for (bound, value) in zip([str(b) for b in self.buckets] + ['+Inf'], self._cumulative(counts)):
+					lines.append(f'{self.name}_bucket{_format_labels(key, {"le": bound})} {value}')
+				lines.append(f'{self.name}_sum{_format_labels(key)} {total}')
+				lines.append(f'{self.name}_count{_format_labels(key)} {count}')
+		return lines
+
+	def _reset(self):
+		with self._lock:
+			self._values.clear()
+
+class MetricsRegistry:
+	# Metrics are disabled until enable() is called. While disabled, recording is a single attribute check.
+	def __init__(self):
+		self.enabled = False
+		self._metrics = {}
+		self._periodic = None
+
+	def enable(self):
+		self.enabled = True
+
+	def disable(self):
+		self.enabled = False
+
+	def counter(self, name: str, help: str) -> Counter:
+		if (name not in self._metrics):
+			self._metrics[name] = Counter(self, name, help)
+		return self._metrics[name]
+
+	def histogram(self, name: str, help: str, buckets: Tuple[float] = DEFAULT_BUCKETS) -> Histogram:
+		if (name not in self._metrics):
+			self._metrics[name] = Histogram(self, name, help, buckets)
+		return self._metrics[name]
+
+	def reset(self):
+		for metric in self._metrics.values():
+			metric._reset()
+
+	def snapshot(self) -> Dict:
+		return dict((name, {
+			'type': 'counter' if isinstance(metric, Counter) else 'histogram',
+			'help': metric.help,
+			'values': metric._snapshot()
+		}) for (name, metric) in self._metrics.items())
+
+	def to_json(self) -> str:
+		return json.dumps(self.snapshot(), indent=4)
+
+	def to_prometheus(self) -> str:
+		lines = []
+		for metric in self._metrics.values():
+			lines.extend(metric._prometheus())
+		return '\n'.join(lines) + '\n'
+
+	def dump(self, path: str):
+		# Writes Prometheus text format for .prom files and a JSON snapshot otherwise
+		content = self.to_prometheus() if path.endswith('.prom') else self.to_json()
+		with open(path, 'w+', encoding='utf8', newline=None) as f:
+			f.write(content)
+
+	def start_periodic_dump(self, paths: List[str], interval: float = 60):
+		self.stop_periodic_dump()
+		stopped = threading.Event()
+
+		def run():
+			while (stopped.wait(interval) == False):
+				for path in paths:
+					self.dump(path)
+
+		thread = threading.Thread(target=run, daemon=True)
+		thread.start()
+		self._periodic = (thread, stopped)
+
+	def stop_periodic_dump(self):
+		if (self._periodic != None):
+			(thread, stopped) = self._periodic
+			stopped.set()
+			thread.join()
+			self._periodic = None
+
+metrics = MetricsRegistry()
@@ -1,11 +1,16 @@
 if __name__ == "__main__":
 	import sys
 	import json
-	from bwtb_data import parse_workout_csv
-	from wodify_data import WorkoutResults
+	from bwtb_data import parse_workout_csv, WorkoutCache
+	from wodify_data import WorkoutResults, dump_ndjson
 
 	csvpath = 'workouts.csv' if (len(sys.argv) <= 1) else sys.argv[1]
-	outpath = 'wodify.json' if (len(sys.argv) <= 2) else sys.argv[2]
-	output=WorkoutResults.from_bwtb(parse_workout_csv(csvpath))._asdict()
-	with open(outpath, 'w+', encoding='utf8', newline=None) as f:
-		json.dump(output, f, indent=4)
+	outpath = 'wodify.ndjson' if (len(sys.argv) <= 2) else sys.argv[2]
+	with WorkoutCache('.parsecache') as cache:
+		if (outpath.endswith('.json')):
+			output=WorkoutResults.from_bwtb(parse_workout_csv(csvpath, cache=cache))._asdict()
+			with open(outpath, 'w+', encoding='utf8', newline=None) as f:
+				json.dump(output, f, indent=4)
+		else:
+			with open(outpath, 'w+', encoding='utf8', newline=None) as f:
+				dump_ndjson(WorkoutResults.iter_bwtb(parse_workout_csv(csvpath, cache=cache)), f)
@@ -0,0 +1,162 @@
+import datetime
+import numpy as np
+from typing import NamedTuple, Iterable, List, Union
+from wodify_data import WorkoutResults, Weighlifting
+
+class PersonalRecords(NamedTuple):
+	athlete: np.ndarray
+	name: np.ndarray
+	weight: np.ndarray
+	reps: np.ndarray
+	date: np.ndarray
+
+class WeeklyTotals(NamedTuple):
+	athlete: np.ndarray
+	name: np.ndarray
+	week: np.ndarray
+	tonnage: np.ndarray
+	volume: np.ndarray
+
+def _encode(values: List[str], table: dict) -> np.ndarray:
+	return np.fromiter((table.setdefault(value, len(table)) for value in values), dtype=np.int32, count=len(values))
+
+def _decode(codes: np.ndarray, table: dict) -> np.ndarray:
+	names = np.empty(len(table), dtype=object)
+	for (name, code) in table.items():
+		names[code] = name
+	return names[codes]
+
+def _group_ends(keys: np.ndarray) -> np.ndarray:
+	# Index of the last row of every group in an array that is sorted by its group keys
+	if (len(keys) == 0):
+		return np.empty(0, dtype=np.int64)
+	return np.append(np.flatnonzero(keys[1:] != keys[:-1]), len(keys) - 1)
+
+def epley(weight: np.ndarray, reps: np.ndarray) -> np.ndarray:
+	return np.where(reps <= 1, weight, weight * (1 + reps / 30.0))
+
+def brzycki(weight: np.ndarray, reps: np.ndarray) -> np.ndarray:
+	# The formula is undefined from 37 reps so those sets do not estimate a max
+	with np.errstate(divide='ignore', invalid='ignore'):
+		return np.where(reps <= 1, weight, np.where(reps < 37, weight * 36.0 / (37.0 - reps), np.nan))
+
+_FORMULAS = {
+	'epley': epley,
+	'brzycki': brzycki
+}
+
+class StrengthAnalytics:
+	# Weightlifting results as NumPy columns. Athletes and lift names are stored as integer codes so that grouping
+	# is done with sorts and reductions over whole columns instead of Python loops.
+	_COLUMNS = ('athlete', 'name', 'date', 'sets', 'reps', 'weight')
+	_DTYPES = (np.int32, np.int32, np.int32, np.int32, np.int32, np.float64)
+
+	def __init__(self):
+		self._athletes = {}
+		self._names = {}
+		self._chunks = []
+		for (column, dtype) in zip(StrengthAnalytics._COLUMNS, StrengthAnalytics._DTYPES):
+			setattr(self, f'_{column}', np.empty(0, dtype=dtype))
+
+	def __len__(self):
+		return len(self._consolidate()._date)
+
+	def _consolidate(self) -> 'StrengthAnalytics':
+		# Added results are concatenated once, when they are first needed, instead of on every add
+		if (len(self._chunks) > 0):
+			for (position, column) in enumerate(StrengthAnalytics._COLUMNS):
+				setattr(self, f'_{column}', np.concatenate([getattr(self, f'_{column}')] + [chunk[position] for chunk in self._chunks]))
+			self._chunks = []
+		return self
+
+	@property
+	def athlete(self) -> np.ndarray:
+		return self._consolidate()._athlete
+
+	@property
+	def name(self) -> np.ndarray:
+		return self._consolidate()._name
+
+	@property
+	def date(self) -> np.ndarray:
+		return self._consolidate()._date
+
+	@property
+	def sets(self) -> np.ndarray:
+		return self._consolidate()._sets
+
+	@property
+	def reps(self) -> np.ndarray:
+		return self._consolidate()._reps
+
+	@property
+	def weight(self) -> np.ndarray:
+		return self._consolidate()._weight
+
+	def add(self, results: Union[WorkoutResults, Iterable[Weighlifting]], athlete: str = None) -> 'StrengthAnalytics':
+		if (isinstance(results, WorkoutResults)):
+			# Results that are already held as columns are read as arrays instead of record by record
+			arrays = results.arrays('weightlifting')
+			names = arrays.names
+			dates = np.asarray(arrays.dates, dtype=np.int32)
+			sets = np.asarray(arrays.sets, dtype=np.int32)
+			reps = np.asarray(arrays.reps, dtype=np.int32)
+			weights = np.asarray(arrays.weights, dtype=np.float64)
+		else:
+			records = list(results)
+			names = [r.name for r in records]
+			dates = np.fromiter((datetime.datetime.strptime(r.date, '%m/%d/%Y').toordinal() for r in records), dtype=np.int32, count=len(records))
+			sets = np.fromiter((r.sets or 0 for r in records), dtype=np.int32, count=len(records))
+			reps = np.fromiter((r.reps or 0 for r in records), dtype=np.int32, count=len(records))
+			weights = np.fromiter((r.weight for r in records), dtype=np.float64, count=len(records))
+
+		return self.add_columns(np.full(len(names), self.athlete_code(athlete), dtype=np.int32), _encode(names, self._names), dates, sets, reps, weights)
+
+	def add_columns(self, athlete: np.ndarray, name: np.ndarray, date: np.ndarray, sets: np.ndarray, reps: np.ndarray, weight: np.ndarray) -> 'StrengthAnalytics':
+		# Copies the columns so that they do not hold on to the buffers of the results they came from
+		self._chunks.append(tuple(np.array(values, dtype=dtype) for (values, dtype) in zip((athlete, name, date, sets, reps, weight), StrengthAnalytics._DTYPES)))
+		return self
+
+	def athlete_code(self, athlete: str) -> int:
+		return self._athletes.setdefault(athlete, len(self._athletes))
+
+	def name_code(self, name: str) -> int:
+		return self._names.setdefault(name, len(self._names))
+
+	def _group_keys(self) -> np.ndarray:
+		return self.athlete.astype(np.int64) * max(len(self._names), int(self.name.max(initial=0)) + 1) + self.name
+
+	def _records(self, score: np.ndarray) -> PersonalRecords:
+		# The best score of every lift of every athlete. Ties go to the most recent result.
+		keys = self._group_keys()
+		valid = np.isfinite(score)
+		order = np.flatnonzero(valid)[np.lexsort((self.date[valid], score[valid], keys[valid]))]
+		best = order[_group_ends(keys[order])]
+		return PersonalRecords(
+			athlete=_decode(self.athlete[best], self._athletes), \
+			name=_decode(self.name[best], self._names), \
+			weight=score[best], \
+			reps=self.reps[best], \
+			date=self.date[best])
+
+	def estimated_1rm(self, formula: str = 'epley') -> np.ndarray:
+		return _FORMULAS[formula](self.weight, self.reps.astype(np.float64))
+
+	def personal_records(self) -> PersonalRecords:
+		return self._records(self.weight)
+
+	def estimated_1rm_records(self, formula: str = 'epley') -> PersonalRecords:
+		return self._records(self.estimated_1rm(formula))
+
+	def weekly_totals(self) -> WeeklyTotals:
+		# Weeks are numbered by the ordinal of their Monday
+		weeks = self.date - ((self.date - 1) % 7)
+		keys = (self._group_keys() << 32) | weeks.astype(np.int64)
+		(unique, first, inverse) = np.unique(keys, return_index=True, return_inverse=True)
+		volume = self.sets.astype(np.float64) * self.reps
+		return WeeklyTotals(
+			athlete=_decode(self.athlete[first], self._athletes), \
+			name=_decode(self.name[first], self._names), \
+			week=weeks[first], \
+			tonnage=np.bincount(inverse, weights=volume * self.weight, minlength=len(unique)), \
+			volume=np.bincount(inverse, weights=volume, minlength=len(unique)))
@@ -0,0 +1,87 @@
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Tuple
+
+GYMNASTICS = '1'
+METCON = '2'
+WEIGHTLIFTING = '5'
+
+_SEPARATORS = re.compile(r'[^a-z0-9]+')
+
+def normalize_component(name: str) -> str:
+	return _SEPARATORS.sub(' ', name.lower()).strip()
+
+class ComponentCatalog:
+	# The components that Wodify offers for every component type, kept in a local file so that names are resolved to
+	# the value of their option without searching in the browser. The file is scraped again once it is older than ttl.
+	def __init__(self, path: str = '.components.json', ttl: float = 24 * 60 * 60):
+		self.path = path
+		self.ttl = ttl
+		self.updated = 0
+		self._components = {}
+		self._indexes = {}
+		self._resolved = {}
+		self._lock = threading.Lock()
+		self.load()
+
+	def __len__(self):
+		return sum(len(options) for options in self._components.values())
+
+	def __contains__(self, type: str):
+		return type in self._components
+
+	def is_fresh(self) -> bool:
+		return len(self._components) > 0 and time.time() - self.updated < self.ttl
+
+	def load(self):
+		if (self.path == None or os.path.exists(self.path) == False):
+			return
+		with open(self.path, 'r', encoding='utf8', newline=None) as f:
+			data = json.load(f)
+		with self._lock:
+			self.updated = data.get('updated', 0)
+			self._components = dict((type, [tuple(option) for option in options]) for (type, options) in data.get('components', {}).items())
+			self._reindex()
+
+	def save(self):
+		if (self.path == None):
+			return
+		with open(self.path + '.tmp', 'w+', encoding='utf8', newline=None) as f:
+			json.dump({'updated': self.updated, 'components': self._components}, f, indent=4)
+		os.replace(self.path + '.tmp', self.path)
+
+	def update(self, components: Dict[str, List[Tuple[str, str]]]):
+		# Options without a value are placeholders such as "Select a component"
+		with self._lock:
+			self._components = dict((type, [(text, value) for (text, value) in options if value]) for (type, options) in components.items())
+			self.updated = time.time()
+			self._reindex()
+		self.save()
+
+	def _reindex(self):
+		self._indexes = {}
+		self._resolved = {}
+		for (type, options) in self._components.items():
+			index = {}
+			for (text, value) in options:
+				index.setdefault(normalize_component(text), value)
+			self._indexes[type] = index
+
+	def resolve(self, type: str, name: str, allowretry: bool = True) -> str:
+		# The value of the option for name, or None when there is no such component. Names are compared without case
+		# or punctuation and then, when allowretry, without a trailing "s". Names are never matched to a merely similar
+		# component, e.g. "Hack Squat" to "Back Squat", since that would import the result under another lift.
+		key = (type, name, allowretry)
+		if (key in self._resolved):
+			return self._resolved[key]
+
+		index = self._indexes.get(type, {})
+		normalized = normalize_component(name)
+		value = index.get(normalized)
+		if (value == None and allowretry and normalized.endswith('s')):
+			value = index.get(normalized[:-1])
+		self._resolved[key] = value
+		return value
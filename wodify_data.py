@@ -1,7 +1,13 @@
-from typing import NamedTuple, List, Iterable, Union, Callable
-from enum import Enum
+from typing import NamedTuple, List, Iterable, Iterator, Union, Callable
+from array import array
+from bisect import bisect_left, bisect_right
+from enum import Enum, IntEnum
 import datetime
+import functools
+import json
+import sys
 import bwtb_data as bwtb
+from pipeline_metrics import metrics
 
 class Gymnastics(NamedTuple):
 	date: str
@@ -116,52 +122,350 @@ def _metcon_from_result(result: bwtb.WorkoutResult, benchmark: bool = True) -> M
 		benchmark=benchmark and measure != None
 	)
 
-class WorkoutResults:
-	def __init__(self, gymnastics: List[Gymnastics] = [], weightlifting: List[Weighlifting] = [], metcons: List[Metcon] = []):
-		self.gymnastics = gymnastics
-		self.weightlifting = weightlifting
-		self.metcons = metcons
-
-	def _append_metcon(self, result: bwtb.WorkoutResult, benchmark = True):
-		metcon = _metcon_from_result(result, benchmark)
-		if (metcon != None):
-			self.metcons.append(metcon)
-			return True
-		return False
-
-	def _append_sets(self, result: bwtb.WorkoutResult):
-		sets = result.workout.sets if hasattr(result.workout, 'sets') else None
-		rep_scheme = bwtb.RepScheme.from_movements(result.workout.movements, sets=sets)
-		if (rep_scheme == None):
-			return self._append_metcon(result, benchmark=False)
-
-		date = _parse_date(result.date)
-		if (rep_scheme.weight == 0):
-			self.gymnastics.append(Gymnastics(
-				date=date, \
-				name=rep_scheme.summary, \
-				sets=rep_scheme.sets, \
-				reps=rep_scheme.reps, \
-				prescribed=result.prescribed, \
-				notes=_append_notes(result.workout.description, result.notes)))
-			return True
-
-		self.weightlifting.append(Weighlifting(
+def _sets_from_result(result: bwtb.WorkoutResult) -> WorkoutResult:
+	sets = result.workout.sets if hasattr(result.workout, 'sets') else None
+	rep_scheme = bwtb.RepScheme.from_movements(result.workout.movements, sets=sets)
+	if (rep_scheme == None):
+		return _metcon_from_result(result, benchmark=False)
+
+	date = _parse_date(result.date)
+	if (rep_scheme.weight == 0):
+		return Gymnastics(
 			date=date, \
 			name=rep_scheme.summary, \
 			sets=rep_scheme.sets, \
 			reps=rep_scheme.reps, \
-			weight=rep_scheme.weight, \
 			prescribed=result.prescribed, \
-			notes=_append_notes(result.workout.description, result.notes)))
-		return True
+			notes=_append_notes(result.workout.description, result.notes))
+
+	return Weighlifting(
+		date=date, \
+		name=rep_scheme.summary, \
+		sets=rep_scheme.sets, \
+		reps=rep_scheme.reps, \
+		weight=rep_scheme.weight, \
+		prescribed=result.prescribed, \
+		notes=_append_notes(result.workout.description, result.notes))
+
+def _from_bwtb_result(result: bwtb.WorkoutResult) -> WorkoutResult:
+	if (isinstance(result.workout, bwtb.EMOM)):
+		return _sets_from_result(result)
+	if (isinstance(result.workout, bwtb.Sets)):
+		return _sets_from_result(result)
+	return _metcon_from_result(result, benchmark=(isinstance(result.workout, bwtb.Tabata) == False))
+
+_KINDS = {
+	Gymnastics: 'gymnastics',
+	Weighlifting: 'weightlifting',
+	Metcon: 'metcon'
+}
+
+_RECORDS = dict((kind, record) for (record, kind) in _KINDS.items())
+
+def get_kind(record: WorkoutResult) -> str:
+	return _KINDS[type(record)]
+
+_results_routed = metrics.counter('wodify_results_total', 'Parsed workout results by the kind of Wodify result they were transformed into')
+
+class _StringTable:
+	# Stores every distinct string once and refers to it by position
+	def __init__(self):
+		self.values = []
+		self._ids = {}
+
+	def add(self, value: str) -> int:
+		position = self._ids.get(value)
+		if (position == None):
+			position = len(self.values)
+			self._ids[value] = position
+			self.values.append(sys.intern(value) if isinstance(value, str) else value)
+		return position
+
+	def __getstate__(self):
+		return self.values
+
+	def __setstate__(self, values):
+		self.values = values
+		self._ids = dict((value, position) for (position, value) in enumerate(values))
+
+class _MeasureTag(IntEnum):
+	NONE = 0,
+	DISTANCE = 1,
+	TIME = 2,
+	CALORIES = 3,
+	ROUNDS = 4,
+	REPS = 5,
+	ROUNDS_AND_REPS = 6,
+	OTHER = 7
+
+_MEASURE_TAGS = {
+	'distance': _MeasureTag.DISTANCE,
+	'time': _MeasureTag.TIME,
+	'cal': _MeasureTag.CALORIES,
+	'rounds': _MeasureTag.ROUNDS,
+	'reps': _MeasureTag.REPS,
+	'rounds_and_reps': _MeasureTag.ROUNDS_AND_REPS
+}
+
+_NO_VALUE = -2 ** 31
+
+def _encode_int(value) -> int:
+	return _NO_VALUE if value == None else value
+
+def _decode_int(value: int):
+	return None if value == _NO_VALUE else value
+
+def _replace_missing(values: array, missing: int) -> array:
+	if (_NO_VALUE not in values):
+		return array(values.typecode, values)
+	return array(values.typecode, (missing if value == _NO_VALUE else value for value in values))
 
-	def _append_from_bwtb(self, result: bwtb.WorkoutResult):
-		if (isinstance(result.workout, bwtb.EMOM)):
-			return self._append_sets(result)
-		if (isinstance(result.workout, bwtb.Sets)):
-			return self._append_sets(result)
-		return self._append_metcon(result, benchmark=(isinstance(result.workout, bwtb.Tabata) == False))
+class ResultArrays(NamedTuple):
+	# Copies of the columns of one kind of result. Dates are ordinals and sets, reps and weights are empty for the
+	# kinds of result that do not have them.
+	names: List[str]
+	dates: array
+	sets: array
+	reps: array
+	weights: array
+
+class _ResultColumns:
+	# Holds one kind of result as columns of primitive values instead of a list of NamedTuples. Dates are kept as
+	# ordinals, names and notes are shared through string tables and metcon measures are kept as a tag and two
+	# numbers. Records are only materialized when they are read.
+	def __init__(self, record, records: Iterable[WorkoutResult] = None):
+		self._record = record
+		self._strings = _StringTable()
+		self._dates = array('i')
+		self._names = array('I')
+		self._notes = array('I')
+		self._prescribed = bytearray()
+		self._sets = array('i')
+		self._reps = array('i')
+		self._weights = array('d')
+		self._measures = array('b')
+		self._values = array('i')
+		self._units = array('i')
+		self._benchmark = bytearray()
+		self._other = {}
+		self._indexes = None
+		if (records != None):
+			self.extend(records)
+
+	def append(self, record: WorkoutResult):
+		self._indexes = None
+		self._dates.append(_date_to_ordinal(record.date))
+		self._names.append(self._strings.add(record.name))
+		self._notes.append(self._strings.add(record.notes))
+		self._prescribed.append(1 if record.prescribed else 0)
+		if (self._record == Metcon):
+			self._append_measure(record.measure)
+			self._benchmark.append(1 if record.benchmark else 0)
+			return
+
+		self._sets.append(_encode_int(record.sets))
+		self._reps.append(_encode_int(record.reps))
+		if (self._record == Weighlifting):
+			self._weights.append(record.weight)
+
+	def _append_measure(self, measure):
+		tag = _MeasureTag.NONE if measure == None else _MEASURE_TAGS.get(measure.get('type'), _MeasureTag.OTHER)
+		value = 0
+		unit = 0
+		if (tag == _MeasureTag.DISTANCE):
+			value = measure.get('value')
+			unit = int(measure.get('unit'))
+		elif (tag == _MeasureTag.TIME):
+			value = measure.get('min')
+			unit = measure.get('sec')
+		elif (tag == _MeasureTag.ROUNDS_AND_REPS):
+			value = measure.get('rounds')
+			unit = measure.get('reps')
+		elif (tag == _MeasureTag.OTHER):
+			self._other[len(self._measures)] = measure
+		elif (tag != _MeasureTag.NONE):
+			value = measure.get('value')
+
+		self._measures.append(tag)
+		self._values.append(value)
+		self._units.append(unit)
+
+	def _get_measure(self, index: int):
+		tag = self._measures[index]
+		value = self._values[index]
+		unit = self._units[index]
+		if (tag == _MeasureTag.NONE):
+			return None
+		if (tag == _MeasureTag.DISTANCE):
+			return _get_distance_measure(value, DistanceUnit(str(unit)))
+		if (tag == _MeasureTag.TIME):
+			return {
+				'type': 'time',
+				'min': value,
+				'sec': unit
+			}
+		if (tag == _MeasureTag.ROUNDS_AND_REPS):
+			return {
+				'type': 'rounds_and_reps',
+				'rounds': value,
+				'reps': unit
+			}
+		if (tag == _MeasureTag.OTHER):
+			return self._other[index]
+		return _get_measure(_MEASURE_TYPES[tag], value)
+
+	def extend(self, records: Iterable[WorkoutResult]):
+		for record in records:
+			self.append(record)
+
+	def arrays(self, missing: int = 0) -> ResultArrays:
+		# Missing sets and reps are given as missing
+		strings = self._strings.values
+		return ResultArrays(
+			names=[strings[position] for position in self._names],
+			dates=array('i', self._dates),
+			sets=_replace_missing(self._sets, missing),
+			reps=_replace_missing(self._reps, missing),
+			weights=array('d', self._weights))
+
+	def _get(self, index: int) -> WorkoutResult:
+		date = _ordinal_to_date(self._dates[index])
+		name = self._strings.values[self._names[index]]
+		notes = self._strings.values[self._notes[index]]
+		prescribed = self._prescribed[index] == 1
+		if (self._record == Metcon):
+			return Metcon(date=date, name=name, measure=self._get_measure(index), prescribed=prescribed, notes=notes, benchmark=self._benchmark[index] == 1)
+		if (self._record == Weighlifting):
+			weight = self._weights[index]
+			return Weighlifting(date=date, name=name, sets=_decode_int(self._sets[index]), reps=_decode_int(self._reps[index]), weight=int(weight) if weight.is_integer() else weight, prescribed=prescribed, notes=notes)
+		return Gymnastics(date=date, name=name, sets=_decode_int(self._sets[index]), reps=_decode_int(self._reps[index]), prescribed=prescribed, notes=notes)
+
+	def __getitem__(self, index):
+		if (isinstance(index, slice)):
+			return [self._get(i) for i in range(*index.indices(len(self)))]
+		if (index < 0):
+			index += len(self)
+		if (index < 0 or index >= len(self)):
+			raise IndexError('result index out of range')
+		return self._get(index)
+
+	def __len__(self):
+		return len(self._dates)
+
+	def __iter__(self):
+		for index in range(len(self)):
+			yield self._get(index)
+
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		state['_indexes'] = None
+		return state
+
+	def _get_indexes(self):
+		# Built on first query and dropped whenever a result is added. Positions are kept in date order both for
+		# all results and for every normalized name so that a date range is a bisect into either one of them.
+		if (self._indexes == None):
+			order = sorted(range(len(self)), key=self._dates.__getitem__)
+			byName = {}
+			for position in order:
+				key = _normalize_name(self._strings.values[self._names[position]])
+				entry = byName.get(key)
+				if (entry == None):
+					entry = (array('I'), array('i'))
+					byName[key] = entry
+				entry[0].append(position)
+				entry[1].append(self._dates[position])
+			self._indexes = ((array('I', order), array('i', (self._dates[position] for position in order))), byName)
+		return self._indexes
+
+	def _select(self, name: str = None, start: int = None, end: int = None) -> memoryview:
+		(byDate, byName) = self._get_indexes()
+		(positions, dates) = byDate if name == None else byName.get(_normalize_name(name), _EMPTY_INDEX)
+		low = 0 if start == None else bisect_left(dates, start)
+		high = len(dates) if end == None else bisect_right(dates, end)
+		return memoryview(positions)[low:max(low, high)]
+
+_EMPTY_INDEX = (array('I'), array('i'))
+
+def _normalize_name(name: str) -> str:
+	return ' '.join(name.lower().split()) if name != None else ''
+
+class ResultsView:
+	# The results matched by a query. Records are read from the underlying results when they are accessed.
+	def __init__(self, selections: List):
+		self._selections = selections
+
+	def __len__(self):
+		return sum(len(positions) for (_, positions) in self._selections)
+
+	def __iter__(self):
+		for (columns, positions) in self._selections:
+			for position in positions:
+				yield columns._get(position)
+
+	def __getitem__(self, index: int) -> WorkoutResult:
+		if (index < 0):
+			index += len(self)
+		for (columns, positions) in self._selections:
+			if (index < len(positions)):
+				return columns._get(positions[index])
+			index -= len(positions)
+		raise IndexError('result index out of range')
+
+_MEASURE_TYPES = dict((tag, measure) for (measure, tag) in _MEASURE_TAGS.items())
+
+def _date_to_ordinal(date: str) -> int:
+	return datetime.date(int(date[6:10]), int(date[0:2]), int(date[3:5])).toordinal()
+
+def _ordinal_to_date(ordinal: int) -> str:
+	return datetime.date.fromordinal(ordinal).strftime('%m/%d/%Y')
+
+def _to_ordinal(date: Union[str, datetime.date]) -> int:
+	if (date == None):
+		return None
+	if (isinstance(date, datetime.date)):
+		return date.toordinal()
+	return _date_to_ordinal(date)
+
+class WorkoutResults:
+	def __init__(self, gymnastics: List[Gymnastics] = None, weightlifting: List[Weighlifting] = None, metcons: List[Metcon] = None):
+		self.gymnastics = _ResultColumns(Gymnastics, gymnastics)
+		self.weightlifting = _ResultColumns(Weighlifting, weightlifting)
+		self.metcons = _ResultColumns(Metcon, metcons)
+
+	def append(self, record: WorkoutResult):
+		if (isinstance(record, Gymnastics)):
+			self.gymnastics.append(record)
+		elif (isinstance(record, Weighlifting)):
+			self.weightlifting.append(record)
+		else:
+			self.metcons.append(record)
+
+	def query(self, kind: str = None, name: str = None, start: Union[str, datetime.date] = None, end: Union[str, datetime.date] = None) -> ResultsView:
+		# Results of the given kind ('gymnastics', 'weightlifting' or 'metcon') and name between start and end
+		# inclusive. Results of each kind come back in date order.
+		columns = [self.gymnastics, self.weightlifting, self.metcons]
+		if (kind != None):
+			columns = [self._get_columns(kind)]
+		return ResultsView([(c, c._select(name, _to_ordinal(start), _to_ordinal(end))) for c in columns])
+
+	def arrays(self, kind: str, missing: int = 0) -> ResultArrays:
+		# The results of the given kind as arrays, e.g. for numpy
+		return self._get_columns(kind).arrays(missing)
+
+	def _get_columns(self, kind: str) -> _ResultColumns:
+		if (kind == 'gymnastics'):
+			return self.gymnastics
+		if (kind == 'weightlifting'):
+			return self.weightlifting
+		if (kind == 'metcon' or kind == 'metcons'):
+			return self.metcons
+		raise Exception(f'Unknown kind of result {kind}')
+
+	def extend(self, other: 'WorkoutResults'):
+		self.gymnastics.extend(other.gymnastics)
+		self.weightlifting.extend(other.weightlifting)
+		self.metcons.extend(other.metcons)
 
 	def __len__(self):
 		return len(self.gymnastics) + len(self.weightlifting) + len(self.metcons)
@@ -173,10 +477,97 @@ class WorkoutResults:
 			'metcons': [m._asdict() for m in self.metcons]
 		}
 
+	@staticmethod
+	def iter_bwtb(results: Iterable[bwtb.WorkoutResult], ignored_result: Callable[[bwtb.WorkoutResult], None] = None) -> Iterator[WorkoutResult]:
+		for result in results:
+			record = _from_bwtb_result(result)
+			if (record != None):
+				_results_routed.inc(kind=get_kind(record))
+				yield record
+			else:
+				_results_routed.inc(kind='ignored')
+				if (ignored_result != None):
+					ignored_result(result)
+
 	@staticmethod
 	def from_bwtb(results: Iterable[bwtb.WorkoutResult], ignored_result: Callable[[bwtb.WorkoutResult], None] = None):
 		summary = WorkoutResults()
-		for result in results:
-			if (summary._append_from_bwtb(result) == False and ignored_result != None):
-				ignored_result(result)
-		return summary
\ No newline at end of file
+		for record in WorkoutResults.iter_bwtb(results, ignored_result):
+			summary.append(record)
+		return summary
+
+	@staticmethod
+	def from_bwtb_csv(csvpath: str, ignored_result: Callable[[bwtb.WorkoutResult], None] = None, workers: int = None, chunksize: int = 256, cache: bwtb.WorkoutCache = None, snapshot: bwtb.WorkoutSnapshot = None):
+		if (workers == None or workers <= 1):
+			return WorkoutResults.from_bwtb(bwtb.parse_workout_csv(csvpath, cache=cache, snapshot=snapshot), ignored_result)
+
+		summary = WorkoutResults()
+		for (partial, ignored) in bwtb.map_workout_csv(csvpath, functools.partial(_from_bwtb_rows, cache=cache), workers=workers, chunksize=chunksize, snapshot=snapshot):
+			summary.extend(partial)
+			if (ignored_result != None):
+				for result in ignored:
+					ignored_result(result)
+		return summary
+
+def _from_bwtb_rows(rows, cache = None):
+	# Runs in a worker process so both parsing and classification happen off of the main process
+	ignored = []
+	summary = WorkoutResults.from_bwtb(bwtb._parse_workout_rows(rows, cache), ignored.append)
+	return (summary, ignored)
+
+def dump_ndjson(records: Iterable[WorkoutResult], f) -> int:
+	# One record per line, tagged with its kind, so that results can be written and read back as a stream
+	count = 0
+	for record in records:
+		line = record._asdict()
+		line['kind'] = get_kind(record)
+		f.write(json.dumps(line))
+		f.write('\n')
+		count += 1
+	return count
+
+def _load_ndjson_record(line: str) -> WorkoutResult:
+	# Fields that are not part of the record, e.g. why it failed to import, are ignored
+	fields = json.loads(line)
+	record = _RECORDS[fields.pop('kind')]
+	return record(**dict((name, fields[name]) for name in record._fields if name in fields))
+
+class NdjsonResults:
+	def __init__(self, path: str):
+		self.path = path
+		self._offsets = None
+
+	def _get_offsets(self):
+		# Byte offset of every record so that reading can start at any position without parsing what comes before it
+		if (self._offsets == None):
+			offsets = array('q')
+			with open(self.path, 'rb') as f:
+				offset = 0
+				for line in f:
+					if (len(line.strip()) > 0):
+						offsets.append(offset)
+					offset += len(line)
+			self._offsets = offsets
+		return self._offsets
+
+	def __len__(self):
+		return len(self._get_offsets())
+
+	def __iter__(self):
+		return self.iter_from(0)
+
+	def __getitem__(self, index: int) -> WorkoutResult:
+		with open(self.path, 'rb') as f:
+			f.seek(self._get_offsets()[index])
+			return _load_ndjson_record(f.readline().decode('utf8'))
+
+	def iter_from(self, position: int = 0) -> Iterator[WorkoutResult]:
+		offsets = self._get_offsets()
+		if (position >= len(offsets)):
+			return
+
+		with open(self.path, 'rb') as f:
+			f.seek(offsets[position])
+			for line in f:
+				if (len(line.strip()) > 0):
+					yield _load_ndjson_record(line.decode('utf8'))
@@ -1,19 +1,182 @@
+import hashlib
 import os
-from typing import List, Callable
+import random
+import requests
+import threading
+import time
+from collections import deque
+from queue import Queue
+from typing import NamedTuple, List, Iterable, Callable, Dict, Any
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import Select, WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, StaleElementReferenceException, ElementNotInteractableException, ElementClickInterceptedException, NoSuchElementException, WebDriverException
 from webdriver_manager.chrome import ChromeDriverManager
-from wodify_data import WorkoutResults, Weighlifting, Gymnastics, Metcon
+from wodify_data import WorkoutResults, WorkoutResult, Weighlifting, Gymnastics, Metcon, get_kind
+from pipeline_metrics import metrics
+from wodify_ledger import ImportLedger, DeadLetters, IMPORTED, FALLBACK, get_record_key
+from wodify_catalog import ComponentCatalog, GYMNASTICS, METCON, WEIGHTLIFTING
+
+class BrowserSettings(NamedTuple):
+	headless: bool = False
+	# Each browser gets its own numbered copy of this profile for its account so that parallel sessions do not share
+	# one and a session that is still signed in is never reused for another athlete
+	profile: str = '.wodify-profile'
+	blockresources: bool = True
+	driverpath: str = '.chromedriver'
+
+_settings = BrowserSettings()
+
+def configure_browser(**settings):
+	global _settings
+	_settings = _settings._replace(**settings)
+
+# Images, fonts and trackers are not needed to fill in the forms
+_BLOCKED_URLS = ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.svg', '*.ico', '*.woff', '*.woff2', '*.ttf', '*.otf', '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*facebook.net*', '*hotjar.com*', '*intercom.io*']
+
+_driverpath = None
+_driverpath_lock = threading.Lock()
+_profiles = set()
+_profiles_lock = threading.Lock()
+
+def _get_driver_path(refresh: bool = False) -> str:
+	# Resolving the driver with ChromeDriverManager checks for updates online so the path is remembered between runs.
+	# refresh resolves it again, e.g. once Chrome has updated itself past the remembered driver. Sessions that start
+	# together resolve it one at a time, and the file is replaced whole so that other processes never read half of it.
+	global _driverpath
+	with _driverpath_lock:
+		if (refresh or _driverpath == None or os.path.exists(_driverpath) == False):
+			cached = None
+			if (refresh == False and _settings.driverpath != None and os.path.exists(_settings.driverpath)):
+				with open(_settings.driverpath, 'r', encoding='utf8') as f:
+					cached = f.read().strip()
+			if (cached == None or os.path.exists(cached) == False):
+				cached = ChromeDriverManager().install()
+				if (_settings.driverpath != None):
+					temp = f'{_settings.driverpath}.{os.getpid()}.tmp'
+					with open(temp, 'w+', encoding='utf8') as f:
+						f.write(cached)
+					os.replace(temp, _settings.driverpath)
+			_driverpath = cached
+		return _driverpath
+
+def _acquire_profile(username: str) -> str:
+	if (_settings.profile == None):
+		return None
+	account = hashlib.sha1(str(username).encode('utf8')).hexdigest()[:12]
+	with _profiles_lock:
+		slot = 0
+		while (f'{_settings.profile}-{account}-{slot}' in _profiles):
+			slot += 1
+		profile = f'{_settings.profile}-{account}-{slot}'
+		_profiles.add(profile)
+		return profile
+
+def _release_profile(profile: str):
+	with _profiles_lock:
+		_profiles.discard(profile)
+
+def _launch_browser(profile: str):
+	options = webdriver.ChromeOptions()
+	if (_settings.headless):
+		options.add_argument('--headless=new')
+		options.add_argument('--window-size=1920,1080')
+	if (profile != None):
+		options.add_argument(f'--user-data-dir={os.path.abspath(profile)}')
+	if (_settings.blockresources):
+		options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+	try:
+		driver = webdriver.Chrome(_get_driver_path(), options=options)
+	except WebDriverException:
+		# The remembered driver may no longer match the version of Chrome, so it is resolved again and tried once more
+		driver = webdriver.Chrome(_get_driver_path(refresh=True), options=options)
+	if (_settings.blockresources):
+		driver.execute_cdp_cmd('Network.enable', {})
+		driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': _BLOCKED_URLS})
+	return driver
+
+_SIGNIN = 'Input_UserName'
+_MENU = 'AthleteTheme_wtLayoutNormal_block_wtMenu_AthleteTheme_wt67_block_wt34'
+
+class _signin_or_menu_condition(object):
+	def __call__(self, driver):
+		for id in [_SIGNIN, _MENU]:
+			if (len(driver.find_elements_by_id(id)) > 0):
+				return id
+		return False
 
-def _ensure_driver(driver, username, password):
-	if (driver == None):
-		driver = webdriver.Chrome(ChromeDriverManager().install())
-		driver.get('https://app.wodify.com')
+def _open_session(driver, username, password):
+	driver.get('https://app.wodify.com')
+	# A profile that is still signed in from an earlier run goes straight to the app, so whichever of the sign in
+	# form and the menu appears first decides whether to sign in
+	if (_wait(driver, 'sign in or menu', _signin_or_menu_condition()) == _SIGNIN):
 		_signin(driver, username, password)
-		_goto_myperformances(driver)
+	_goto_myperformances(driver)
+
+_launch_seconds = metrics.histogram('wodify_browser_launch_seconds', 'Time spent starting a browser and opening a signed in session')
+_relaunches = metrics.counter('wodify_browser_relaunches_total', 'Browsers that had stopped responding and were started again')
+
+class _BrowserSession:
+	# Stands in for the WebDriver of one browser. refresh() is called after every failed attempt to import a result
+	# and relaunches the browser in place when it has crashed, so callers keep using the same object.
+	def __init__(self, username, password):
+		self._username = username
+		self._password = password
+		self._profile = _acquire_profile(username)
+		self._driver = None
+		try:
+			self._launch()
+		except:
+			self.quit()
+			raise
+
+	def __getattr__(self, name):
+		return getattr(self._driver, name)
+
+	def _launch(self):
+		with _launch_seconds.time():
+			self._driver = _launch_browser(self._profile)
+			_open_session(self._driver, self._username, self._password)
+
+	def is_alive(self) -> bool:
+		try:
+			self._driver.current_url
+			return True
+		except:
+			return False
+
+	def refresh(self):
+		if (self.is_alive()):
+			self._driver.refresh()
+			return
+
+		_relaunches.inc()
+		try:
+			self._driver.quit()
+		except:
+			pass
+		self._launch()
+
+	def quit(self):
+		try:
+			if (self._driver != None):
+				self._driver.quit()
+		finally:
+			self._driver = None
+			_release_profile(self._profile)
+
+def _ensure_driver(driver, username, password, engine: str = 'browser'):
+	if (driver == None):
+		driver = _BrowserSession(username, password)
+		if (engine == 'http'):
+			# The browser is only needed to sign in. Its session is handed over to plain HTTP requests.
+			browser = driver
+			try:
+				driver = _get_http_engine().WodifyHttpSession.from_driver(browser)
+			finally:
+				browser.quit()
 		return (driver, True)
 	return (driver, False)
 
@@ -22,16 +185,101 @@ def _cleanup(driver, destroy):
 		driver.quit()
 
 def _signin(driver, username, password):
-	_send_keys(driver, (By.ID, 'Input_UserName'), username)
+	_send_keys(driver, (By.ID, _SIGNIN), username)
 	_send_keys(driver, (By.ID, 'Input_Password'), password, skipcheck=True)
 	_click(driver, (By.CLASS_NAME, 'signin-btn'))
 
-def _wait_for_element(driver, criteria, timeout = 10, condition=EC.presence_of_element_located):
-	criteria = condition(criteria)
-	element = WebDriverWait(driver, timeout).until(criteria)
-	return element
-
-def _send_keys(driver, criteria, value, timeout = 10, skipcheck = False):
+class WaitSettings(NamedTuple):
+	# Timeouts are the p95 of the latencies seen for a locator times factor, kept within these bounds. Until a
+	# locator has been seen samples times the default is used.
+	default: float = 10
+	minimum: float = 2
+	maximum: float = 30
+	probedefault: float = 2
+	probeminimum: float = 0.25
+	probemaximum: float = 2
+	factor: float = 2
+	samples: int = 5
+	window: int = 200
+	# WebDriverWait checks every half second by default, which would be the shortest latency that could be seen
+	poll: float = 0.05
+
+class LatencyStats(NamedTuple):
+	locator: str
+	count: int
+	p50: float
+	p95: float
+	timeout: float
+	timeouts: int
+
+_wait_seconds = metrics.histogram('wodify_wait_seconds', 'Time spent waiting for an element or page by locator')
+
+def _percentile(ordered: List[float], percentile: float) -> float:
+	return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+class _LatencyTracker:
+	# A rolling window of how long every locator took to appear. Waits that time out are recorded at their timeout
+	# so that a slow site raises the following timeouts.
+	def __init__(self, settings: WaitSettings):
+		self.settings = settings
+		self._latencies = {}
+		self._timeouts = {}
+		self._lock = threading.Lock()
+
+	def observe(self, locator: str, seconds: float, timedout: bool = False):
+		with self._lock:
+			latencies = self._latencies.get(locator)
+			if (latencies == None):
+				latencies = deque(maxlen=self.settings.window)
+				self._latencies[locator] = latencies
+			latencies.append(seconds)
+			if (timedout):
+				self._timeouts[locator] = self._timeouts.get(locator, 0) + 1
+		_wait_seconds.observe(seconds, locator=locator)
+
+	def timeout(self, locator: str, probe: bool = False) -> float:
+		settings = self.settings
+		with self._lock:
+			latencies = self._latencies.get(locator)
+			if (latencies == None or len(latencies) < settings.samples):
+				return settings.probedefault if probe else settings.default
+			p95 = _percentile(sorted(latencies), 0.95)
+		if (probe):
+			return min(max(p95 * settings.factor, settings.probeminimum), settings.probemaximum)
+		return min(max(p95 * settings.factor, settings.minimum), settings.maximum)
+
+	def report(self) -> List[LatencyStats]:
+		with self._lock:
+			latencies = dict((locator, sorted(values)) for (locator, values) in self._latencies.items())
+			timeouts = dict(self._timeouts)
+		return [LatencyStats(locator, len(ordered), _percentile(ordered, 0.5), _percentile(ordered, 0.95), self.timeout(locator), timeouts.get(locator, 0)) for (locator, ordered) in latencies.items()]
+
+_latencies = _LatencyTracker(WaitSettings())
+
+def configure_waits(**settings):
+	_latencies.settings = _latencies.settings._replace(**settings)
+
+def wait_latency_report() -> List[LatencyStats]:
+	return _latencies.report()
+
+def _wait(driver, locator: str, condition, timeout = None, probe = False):
+	# Probes wait for something that is usually not there, so only the times that it did appear are recorded
+	if (timeout == None):
+		timeout = _latencies.timeout(locator, probe)
+	start = time.perf_counter()
+	try:
+		result = WebDriverWait(driver, timeout, poll_frequency=_latencies.settings.poll).until(condition)
+	except TimeoutException:
+		if (probe == False):
+			_latencies.observe(locator, timeout, timedout=True)
+		raise
+	_latencies.observe(locator, time.perf_counter() - start)
+	return result
+
+def _wait_for_element(driver, criteria, timeout = None, condition=EC.presence_of_element_located, probe = False, locator = None):
+	return _wait(driver, locator if locator != None else criteria[1], condition(criteria), timeout, probe)
+
+def _send_keys(driver, criteria, value, timeout = None, skipcheck = False):
 	value = str(value)
 
 	element = _wait_for_element(driver, criteria, timeout)
@@ -52,18 +300,86 @@ def _send_keys(driver, criteria, value, timeout = 10, skipcheck = False):
 
 	return element
 
-def _click(driver, criteria, timeout = 10):
+def _click(driver, criteria, timeout = None):
 	element = _wait_for_element(driver, criteria, timeout, condition=EC.element_to_be_clickable)
 	element.click()
 	return element
 
-def _select(driver, criteria, value, timeout = 10):
+def _select(driver, criteria, value, timeout = None):
 	element = _wait_for_element(driver, criteria, timeout)
 	Select(element).select_by_value(value)
 	return element
 
+# Sets every field in one script. Checkboxes are clicked until they match, other clickable elements are clicked when
+# their value is true and inputs and selects are given their value followed by the events that typing would raise.
+# The values are read back in the same script so that they can all be checked at once.
+_FILL_SCRIPT = """
+var fields = arguments[0];
+var filled = {};
+for (var id in fields) {
+	var element = document.getElementById(id);
+	if (element == null) {
+		continue;
+	}
+	var value = fields[id];
+	if (element.type === 'checkbox') {
+		if (element.checked !== value) {
+			element.click();
+		}
+	} else if (typeof value === 'boolean' || element.value === undefined) {
+		if (value) {
+			element.click();
+		}
+	} else {
+		element.value = value;
+		element.dispatchEvent(new Event('input', { bubbles: true }));
+		element.dispatchEvent(new Event('change', { bubbles: true }));
+		element.dispatchEvent(new Event('blur'));
+	}
+}
+for (var id in fields) {
+	var element = document.getElementById(id);
+	if (element == null) {
+		filled[id] = null;
+	} else if (element.type === 'checkbox') {
+		filled[id] = element.checked;
+	} else if (typeof fields[id] === 'boolean' || element.value === undefined) {
+		filled[id] = fields[id];
+	} else {
+		filled[id] = element.value;
+	}
+}
+return filled;
+"""
+
+_fill_fallbacks = metrics.counter('wodify_fill_fallback_total', 'Form fields that did not take the value set by script and were typed instead')
+
+def _fill(driver, fields, timeout = None):
+	values = dict((id, value if isinstance(value, bool) else str(value)) for (id, value) in fields.items())
+	if (len(values) == 0):
+		return
+
+	_wait_for_element(driver, (By.ID, next(iter(values))), timeout)
+	filled = driver.execute_script(_FILL_SCRIPT, values) or {}
+	for (id, value) in values.items():
+		if (filled.get(id) == value):
+			continue
+
+		# Fields that are not on the page yet or that rejected the value are filled in one at a time
+		_fill_fallbacks.inc()
+		if (isinstance(value, bool)):
+			if (value):
+				_click(driver, (By.ID, id), timeout)
+		else:
+			_send_keys(driver, (By.ID, id), value, timeout)
+
+def _with_notes(fields, notes):
+	if (notes != None and len(notes) > 0):
+		fields['AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Comment'] = notes
+	return fields
+
 def _goto_myperformances(driver):
-	return _click(driver, (By.ID, 'AthleteTheme_wtLayoutNormal_block_wtMenu_AthleteTheme_wt67_block_wt34'))
+	return _click(driver, (By.ID, _MENU))
 
 class _addperformance_condition(object):
 	def __call__(self, driver):
@@ -88,7 +404,7 @@ class _addperformance_condition(object):
 		return False
 
 def _goto_addperformance(driver):
-	element = WebDriverWait(driver, 10).until(_addperformance_condition())
+	element = _wait(driver, 'add performance', _addperformance_condition())
 	element.click()
 	return element
 
@@ -106,7 +422,8 @@ def _search_component(driver, component, skipcheck = False, allowretry = True, i
 		return True
 
 	try:
-		_wait_for_element(driver, (By.CLASS_NAME, 'no-results'), 2)
+		# The search shows either no-results or chosen-results so both share how long the search takes
+		_wait_for_element(driver, (By.CLASS_NAME, 'no-results'), probe=True, locator='chosen search')
 		searchbox.clear()
 
 		try:
@@ -122,7 +439,7 @@ def _search_component(driver, component, skipcheck = False, allowretry = True, i
 		pass
 
 	try:
-		results = _wait_for_element(driver, (By.CLASS_NAME, 'chosen-results'), 2)
+		results = _wait_for_element(driver, (By.CLASS_NAME, 'chosen-results'), probe=True, locator='chosen search')
 		for r in results.find_elements_by_tag_name('li'):
 			if (r.text == component):
 				r.click()
@@ -131,6 +448,73 @@ def _search_component(driver, component, skipcheck = False, allowretry = True, i
 		searchbox.send_keys(Keys.ENTER)
 		return True
 
+_NON_METCON_COMPONENT = 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_wtUserComponent_ComponentIdNonMetcon'
+_METCON_COMPONENT = 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_wtUserComponent_ComponentIdMetcon'
+
+_COMPONENT_SELECTS = {
+	GYMNASTICS: _NON_METCON_COMPONENT,
+	WEIGHTLIFTING: _NON_METCON_COMPONENT,
+	METCON: _METCON_COMPONENT
+}
+
+_OPTIONS_SCRIPT = """
+var element = document.getElementById(arguments[0]);
+if (element == null) {
+	return null;
+}
+return Array.prototype.map.call(element.options, function(option) { return [option.text, option.value]; });
+"""
+
+_catalog = ComponentCatalog()
+_catalog_lock = threading.Lock()
+
+def configure_catalog(path: str = '.components.json', ttl: float = 24 * 60 * 60):
+	global _catalog
+	_catalog = ComponentCatalog(path, ttl)
+
+class _options_loaded(object):
+	def __init__(self, id):
+		self.id = id
+
+	def __call__(self, driver):
+		# Only the placeholder is listed until the options of the chosen type have been loaded
+		options = driver.execute_script(_OPTIONS_SCRIPT, self.id)
+		if (options != None and len(options) > 1):
+			return options
+		return False
+
+def _scrape_components(driver):
+	components = {}
+	for (type, id) in _COMPONENT_SELECTS.items():
+		_goto_addperformance(driver)
+		_choose_type(driver, type)
+		components[type] = _wait(driver, 'component options', _options_loaded(id))
+		driver.refresh()
+	return components
+
+def _get_catalog(driver) -> ComponentCatalog:
+	with _catalog_lock:
+		if (_catalog.is_fresh() == False):
+			_catalog.update(_scrape_components(driver))
+	return _catalog
+
+def _is_unknown_component(driver, type: str, name: str, allowretry: bool = True) -> bool:
+	# Known from the catalog before the form is opened so that a fallback does not open it twice
+	catalog = _get_catalog(driver)
+	return type in catalog and catalog.resolve(type, name, allowretry) == None
+
+def _choose_component(driver, type: str, name: str, allowretry: bool = True, skipcheck: bool = False):
+	# Selects the option of the component by its value. The live search is only used when the catalog does not have
+	# the components of the type.
+	catalog = _get_catalog(driver)
+	if (type not in catalog):
+		return _search_component(driver, name, skipcheck=skipcheck, allowretry=allowretry, id=_COMPONENT_SELECTS[type] + '_chosen')
+	value = catalog.resolve(type, name, allowretry)
+	if (value == None):
+		return False
+	_fill(driver, {_COMPONENT_SELECTS[type]: value})
+	return True
+
 class MetconMeasure:
 	def __init__(self, measure):
 		self.type = measure
@@ -138,9 +522,10 @@ class MetconMeasure:
 	def choose(self, driver):
 		_select(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_wtComponentEdit_wtWODComponent_ResultTypeId'), self.type)
 
-	def prescribed(self, driver, value):
-		if (value):
-			_click(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wt214'))
+	def fields(self, prescribed):
+		if (prescribed):
+			return {'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wt214': True}
+		return {}
 
 class DistanceMeasure(MetconMeasure):
 	def __init__(self, value, unit):
@@ -148,10 +533,11 @@ class DistanceMeasure(MetconMeasure):
 		self.value = value
 		self.unit = unit
 
-	def configure(self, driver, prescribed):
-		_send_keys(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Distance'), self.value)
-		_select(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_DistanceUOM'), self.unit)
-		self.prescribed(driver, prescribed)
+	def fields(self, prescribed):
+		return dict(super().fields(prescribed), **{
+			'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Distance': self.value,
+			'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_DistanceUOM': self.unit
+		})
 
 class TimeMeasure(MetconMeasure):
 	def __init__(self, minutes, sec):
@@ -159,28 +545,31 @@ class TimeMeasure(MetconMeasure):
 		self.min = minutes
 		self.sec = sec
 
-	def configure(self, driver, prescribed):
-		_send_keys(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Minutes'), self.min)
-		_send_keys(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Seconds'), self.sec)
-		self.prescribed(driver, prescribed)
+	def fields(self, prescribed):
+		return dict(super().fields(prescribed), **{
+			'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Minutes': self.min,
+			'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Seconds': self.sec
+		})
 
 class RoundsMeasure(MetconMeasure):
 	def __init__(self, rounds):
 		super().__init__('9')
 		self.rounds = rounds
 
-	def configure(self, driver, prescribed):
-		_send_keys(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Rounds'), self.rounds)
-		self.prescribed(driver, prescribed)
+	def fields(self, prescribed):
+		return dict(super().fields(prescribed), **{
+			'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Rounds': self.rounds
+		})
 
 class RepsMeasure(MetconMeasure):
 	def __init__(self, reps):
 		super().__init__('3')
 		self.reps = reps
 
-	def configure(self, driver, prescribed):
-		_send_keys(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Reps'), self.reps)
-		self.prescribed(driver, prescribed)
+	def fields(self, prescribed):
+		return dict(super().fields(prescribed), **{
+			'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Reps': self.reps
+		})
 
 class RoundsAndRepsMeasure(MetconMeasure):
 	def __init__(self, rounds, reps):
@@ -188,26 +577,28 @@ class RoundsAndRepsMeasure(MetconMeasure):
 		self.rounds = rounds
 		self.reps = reps
 
-	def configure(self, driver, prescribed):
-		_send_keys(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Rounds'), self.rounds)
-		_send_keys(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Reps'), self.reps)
-		self.prescribed(driver, prescribed)
+	def fields(self, prescribed):
+		return dict(super().fields(prescribed), **{
+			'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Rounds': self.rounds,
+			'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Reps': self.reps
+		})
 
 class CaloriesMeasure(MetconMeasure):
 	def __init__(self, cals):
 		super().__init__('11')
 		self.cals = cals
 
-	def configure(self, driver, prescribed):
-		_send_keys(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Calories'), self.cals)
-		self.prescribed(driver, prescribed)
+	def fields(self, prescribed):
+		return dict(super().fields(prescribed), **{
+			'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Calories': self.cals
+		})
 
 class NoMeasure(MetconMeasure):
 	def __init__(self):
 		super().__init__('6')
 
-	def configure(self, driver, prescribed):
-		pass
+	def fields(self, prescribed):
+		return {}
 
 def _get_metcon_measure(result:Metcon):
 	measure = result.measure
@@ -236,197 +627,390 @@ def _get_metcon_measure(result:Metcon):
 	return NoMeasure()
 
 def _add_metcon(result:Metcon, driver):
-	metconComponentId = 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_wtUserComponent_ComponentIdMetcon_chosen'
+	benchmark = result.benchmark and _is_unknown_component(driver, METCON, result.name, allowretry=False) == False
 
 	_goto_addperformance(driver)
-	_choose_type(driver, '2')
+	_choose_type(driver, METCON)
 
 	measure = _get_metcon_measure(result)
 
-	benchmark = result.benchmark
 	if (benchmark):
-		benchmark = _search_component(driver, result.name, id=metconComponentId, allowretry=False)
+		benchmark = _choose_component(driver, METCON, result.name, allowretry=False)
 
 	if (benchmark == False):
-		_search_component(driver, 'Non-Benchmark Metcon', id=metconComponentId, skipcheck=True)
+		_choose_component(driver, METCON, 'Non-Benchmark Metcon', allowretry=False, skipcheck=True)
 		_send_keys(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_wtComponentEdit_wtWODComponent_Description'), result.name)
 		measure.choose(driver)
 		_click(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_wtComponentEdit_wt72'))
 	else:
 		_click(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_wtAddButton'))
 
-	_send_keys(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_W_Utils_UI_wtDatepicker_block_wtDateInputFrom'), result.date).send_keys(Keys.ESCAPE)
-
-	measure.configure(driver, result.prescribed)
+	fields = {
+		'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_W_Utils_UI_wtDatepicker_block_wtDateInputFrom': result.date
+	}
+	fields.update(measure.fields(result.prescribed))
+	_fill(driver, _with_notes(fields, result.notes))
 
-	if (result.notes != None and len(result.notes) > 0):
-		_send_keys(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Comment'), result.notes)
-	
 	_click(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wt200'))
 
 	driver.refresh()
-	return True
+	# False when a benchmark had to fall back to a Non-Benchmark Metcon
+	return benchmark == result.benchmark
+
+def _add_non_benchmark(result, driver):
+	_add_metcon(Metcon(
+		date=result.date, \
+		name=result.name, \
+		measure=None, \
+		prescribed=True, \
+		notes=result.notes, \
+		benchmark=False), driver)
+	return False
 
 def _add_gymnastics(result: Gymnastics, driver):
+	if (_is_unknown_component(driver, GYMNASTICS, result.name)):
+		return _add_non_benchmark(result, driver)
+
 	_goto_addperformance(driver)
-	_choose_type(driver, '1')
-
-	if (_search_component(driver, result.name) == False):
-		_add_metcon(Metcon(
-			date=result.date, \
-			name=result.name, \
-			measure=None, \
-			prescribed=True, \
-			notes=result.notes, \
-			benchmark=False), driver)
-		return False
+	_choose_type(driver, GYMNASTICS)
 
-	_click(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_wtAddButton'))
-	_send_keys(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_W_Utils_UI_wtDatepicker_block_wtDateInputFrom'), result.date).send_keys(Keys.ESCAPE)
-	_send_keys(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtUserComponent_MeasureRepScheme'), result.name)
-	_send_keys(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Sets'), result.sets)
-	_send_keys(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Reps'), result.reps)
+	if (_choose_component(driver, GYMNASTICS, result.name) == False):
+		return _add_non_benchmark(result, driver)
 
-	if (result.prescribed):
-		_click(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wt214'))
+	_click(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_wtAddButton'))
+	_fill(driver, _with_notes({
+		'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_W_Utils_UI_wtDatepicker_block_wtDateInputFrom': result.date,
+		'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtUserComponent_MeasureRepScheme': result.name,
+		'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Sets': result.sets,
+		'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Reps': result.reps,
+		'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wt214': result.prescribed
+	}, result.notes))
 
-	if (result.notes != None and len(result.notes) > 0):
-		_send_keys(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Comment'), result.notes)
-	
 	_click(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wt200'))
 
 	driver.refresh()
 	return True
 
 def _add_weightlifting(result: Weighlifting, driver):
+	if (_is_unknown_component(driver, WEIGHTLIFTING, result.name)):
+		return _add_non_benchmark(result, driver)
+
 	_goto_addperformance(driver)
-	_choose_type(driver, '5')
-
-	if (_search_component(driver, result.name) == False):
-		_add_metcon(Metcon(
-			date=result.date, \
-			name=result.name, \
-			measure=None, \
-			prescribed=True, \
-			notes=result.notes, \
-			benchmark=False), driver)
-		return False
+	_choose_type(driver, WEIGHTLIFTING)
+
+	if (_choose_component(driver, WEIGHTLIFTING, result.name) == False):
+		return _add_non_benchmark(result, driver)
 
 	_click(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_wtAddButton'))
-	_send_keys(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_W_Utils_UI_wtDatepicker_block_wtDateInputFrom'), result.date).send_keys(Keys.ESCAPE)
-	_send_keys(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtUserComponent_MeasureRepScheme'), result.name)
-	_send_keys(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Sets'), result.sets)
-	_send_keys(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Reps'), result.reps)
-	_send_keys(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Weight'), result.weight)
-
-	if (result.notes != None and len(result.notes) > 0):
-		_send_keys(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Comment'), result.notes)
-	
+	_fill(driver, _with_notes({
+		'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_W_Utils_UI_wtDatepicker_block_wtDateInputFrom': result.date,
+		'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtUserComponent_MeasureRepScheme': result.name,
+		'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Sets': result.sets,
+		'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Reps': result.reps,
+		'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wtPerformanceResult_Weight': result.weight
+	}, result.notes))
+
 	_click(driver, (By.ID, 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_wt200'))
 
 	driver.refresh()
 	return True
 
-def _add_with_retry(result, driver, retry: int, handler):
-	for attempt in range(retry - 1):
-		try:
-			handler(result, driver)
+_imported = metrics.counter('wodify_imported_total', 'Results imported into Wodify by kind')
+_fallbacks = metrics.counter('wodify_fallback_total', 'Results imported as a Non-Benchmark Metcon instead of their own component by kind')
+_retries = metrics.counter('wodify_retries_total', 'Attempts to import a result that failed and were retried by kind')
+_import_seconds = metrics.histogram('wodify_import_seconds', 'Time spent importing a result, including retries, by kind')
+
+_failures = metrics.counter('wodify_failures_total', 'Attempts to import a result that failed by kind and class of failure')
+_deadlettered = metrics.counter('wodify_dead_letters_total', 'Results that could not be imported and were written to the dead letter file by kind')
+
+class ValidationError(Exception):
+	# Wodify will not accept the record as it is, so trying it again will not help
+	pass
+
+class UnsupportedRecordError(Exception):
+	# There is no handler for this kind of record
+	pass
+
+class SessionExpiredError(Exception):
+	# Wodify no longer returns the page that was asked for, e.g. because the session was signed out
+	pass
+
+class UnconfirmedSaveError(Exception):
+	# The result was posted but Wodify did not answer with the form, so whether it was saved is unknown
+	pass
+
+class SessionLostError(Exception):
+	# The session kept failing for every record, e.g. because it was signed out or the browser cannot be started
+	pass
+
+_TRANSIENT = set(['timeout', 'stale', 'session'])
+# Failures that are not retried in any form, not even as a Non-Benchmark Metcon, since that could save a result twice
+# or would fail the same way again
+_FINAL = set(['unconfirmed', 'error'])
+# Failures that count toward the session being lost
+_SESSION = set(['session', 'unconfirmed'])
+_BACKOFF = 0.5
+_MAX_BACKOFF = 30
+# Records in a row that can be dead-lettered because of the session before the import is stopped
+_MAX_SESSION_FAILURES = 5
+
+def _classify(error: Exception) -> str:
+	if (isinstance(error, ValidationError)):
+		return 'validation'
+	if (isinstance(error, UnsupportedRecordError)):
+		return 'unsupported'
+	if (isinstance(error, TimeoutException)):
+		return 'timeout'
+	if (isinstance(error, (StaleElementReferenceException, ElementNotInteractableException, ElementClickInterceptedException))):
+		return 'stale'
+	if (isinstance(error, NoSuchElementException)):
+		return 'missing'
+	if (isinstance(error, UnconfirmedSaveError)):
+		return 'unconfirmed'
+	# Only errors of the browser, the connection or a session that was signed out are worth retrying. Anything else
+	# is a bug or a record that cannot be imported and would fail the same way again.
+	if (isinstance(error, (SessionExpiredError, WebDriverException, requests.RequestException))):
+		return 'session'
+	return 'error'
+
+def _backoff(attempt: int) -> float:
+	# Full jitter so that parallel sessions that failed together do not retry together
+	return random.uniform(0, min(_MAX_BACKOFF, _BACKOFF * (2 ** attempt)))
+
+class _SessionHealth:
+	# Counts the records in a row that were dead-lettered because of the session. Once there are limit of them the
+	# session is not coming back, so the import is stopped instead of every remaining record being retried and
+	# dead-lettered in turn.
+	def __init__(self, limit: int = _MAX_SESSION_FAILURES):
+		self.limit = limit
+		self.failures = 0
+
+	def observe(self, failure: str, error: Exception = None):
+		if (failure not in _SESSION):
+			self.failures = 0
 			return
-		except:
-			if (attempt > 0 and isinstance(result, Metcon) and result.benchmark == True):
+		self.failures += 1
+		if (self.failures >= self.limit):
+			raise SessionLostError(f'Stopped after {self.failures} records in a row failed because of the session: {type(error).__name__}: {error}')
+
+def _add_with_retry(result, driver, retry: int, handlers: Dict[type, Callable], deadletters: DeadLetters = None, health: _SessionHealth = None):
+	# True when the result was imported as requested, False when it fell back to a Non-Benchmark Metcon and None when
+	# it could not be imported and was written to the dead letters
+	kind = get_kind(result)
+	try:
+		handler = handlers.get(type(result))
+		if (handler == None):
+			raise UnsupportedRecordError(f'There is no handler for {type(result).__name__} records')
+		with _import_seconds.time(kind=kind):
+			imported = _add_with_retry_attempts(result, driver, retry, handler, kind)
+	except Exception as e:
+		if (deadletters == None):
+			raise
+		failure = _classify(e)
+		deadletters.add(result, failure, e)
+		_deadlettered.inc(kind=kind)
+		if (health != None):
+			health.observe(failure, e)
+		return None
+	if (health != None):
+		health.observe(None)
+	_imported.inc(kind=kind)
+	if (imported == False):
+		_fallbacks.inc(kind=kind)
+	return imported
+
+def _add_with_retry_attempts(result, driver, retry: int, handler, kind: str):
+	downgraded = False
+	attempt = 0
+	while True:
+		try:
+			return handler(result, driver) and downgraded == False
+		except Exception as e:
+			failure = _classify(e)
+			_failures.inc(kind=kind, failure=failure)
+			attempt += 1
+			benchmark = isinstance(result, Metcon) and result.benchmark == True
+			if (failure not in _TRANSIENT):
+				# A benchmark that cannot be entered is tried once more as a Non-Benchmark Metcon. Anything else would
+				# fail the same way again.
+				if (benchmark == False or failure in _FINAL or attempt >= retry):
+					raise
 				result = result._replace(benchmark=False)
+				downgraded = True
+			else:
+				if (attempt >= retry):
+					raise
+				if (attempt > 1 and benchmark):
+					result = result._replace(benchmark=False)
+					downgraded = True
+				time.sleep(_backoff(attempt - 1))
+			_retries.inc(kind=kind)
 			driver.refresh()
-	handler(result, driver)
 
-def _notify(workout, kind, index, onimport:Callable[[str], None] = None, onresumetokenupdated:Callable[[str], None] = None):
+_HANDLERS = {
+	Gymnastics: _add_gymnastics,
+	Weighlifting: _add_weightlifting,
+	Metcon: _add_metcon
+}
+
+def _get_http_engine():
+	# The HTTP engine builds on this module so it is only imported once it is asked for
+	import wodify_http
+	return wodify_http
+
+def _get_handlers(engine: str) -> Dict[type, Callable]:
+	if (engine == 'browser'):
+		return _HANDLERS
+	if (engine == 'http'):
+		return _get_http_engine().HANDLERS
+	raise Exception(f'Unknown import engine {engine}')
+
+def _notify(workout, onimport:Callable[[str], None] = None):
 	if (onimport != None):
 		onimport(f'[{workout.date}] {workout.name}')
 
-	if (onresumetokenupdated != None):
-		onresumetokenupdated(f'{kind}:{index + 1}')
-
-def _write_resume_token(file: str, token: str):
-	if (token == None):
-		if (os.path.exists(file)):
-			os.remove(file)
-	else:
-		with open(file, 'w+', encoding='utf8', newline=None) as f:
-			f.write(token)
+def _import_records(results: Iterable[WorkoutResult], driver, retry: int, handlers: Dict[type, Callable], ledger: ImportLedger = None, deadletters: DeadLetters = None, onimport:Callable[[str], None] = None):
+	health = _SessionHealth()
+	try:
+		for result in results:
+			if (ledger != None and ledger.is_imported(result)):
+				continue
+
+			imported = _add_with_retry(result, driver, retry, handlers, deadletters, health)
+			if (imported == None):
+				continue
+			if (ledger != None):
+				ledger.record(result, IMPORTED if imported else FALLBACK)
+			_notify(result, onimport)
+	finally:
+		if (ledger != None):
+			ledger.flush()
+
+_DONE = object()
+
+class _ImportPool:
+	# Every worker owns its own browser session and pulls records from a shared queue. Records are only put on the
+	# queue once, by the thread that reads the results, so no record is imported by more than one worker.
+	def __init__(self, workers: int, driverfactory: Callable[[], Any], retry: int, handlers: Dict[type, Callable], ledger: ImportLedger = None, deadletters: DeadLetters = None, onimport:Callable[[str], None] = None):
+		self.workers = workers
+		self.driverfactory = driverfactory
+		self.retry = retry
+		self.handlers = handlers
+		self.ledger = ledger
+		self.deadletters = deadletters
+		self.onimport = onimport
+		self.imported = 0
+		self._queue = Queue(maxsize=workers * 2)
+		self._lock = threading.Lock()
+		self._stopped = threading.Event()
+		self._errors = []
+
+	def run(self, results: Iterable[WorkoutResult]) -> int:
+		threads = [threading.Thread(target=self._work, daemon=True) for _ in range(self.workers)]
+		for thread in threads:
+			thread.start()
+		try:
+			queued = set()
+			for result in results:
+				if (self._stopped.is_set()):
+					break
+				# Identical records would otherwise be imported by two workers at the same time
+				key = get_record_key(result)
+				if (key in queued or (self.ledger != None and self.ledger.is_imported(result))):
+					continue
+				queued.add(key)
+				self._queue.put(result)
+		finally:
+			for _ in threads:
+				self._queue.put(_DONE)
+			for thread in threads:
+				thread.join()
+			if (self.ledger != None):
+				self.ledger.flush()
+
+		if (len(self._errors) > 0):
+			raise self._errors[0]
+		return self.imported
+
+	def _work(self):
+		driver = None
+		health = _SessionHealth()
+		try:
+			driver = self.driverfactory()
+			while True:
+				result = self._queue.get()
+				if (result is _DONE):
+					break
+				if (self._stopped.is_set()):
+					continue
+				imported = _add_with_retry(result, driver, self.retry, self.handlers, self.deadletters, health)
+				if (imported == None):
+					continue
+				with self._lock:
+					if (self.ledger != None):
+						self.ledger.record(result, IMPORTED if imported else FALLBACK)
+					self.imported += 1
+					_notify(result, self.onimport)
+		except Exception as e:
+			with self._lock:
+				self._errors.append(e)
+			self._stopped.set()
+			# Keep draining so that the reader is never blocked on a full queue
+			while (self._queue.get() is not _DONE):
+				pass
+		finally:
+			if (driver != None):
+				driver.quit()
 
 class WodifyDriver:
 	@staticmethod
-	def _import_gymnastics(result: Gymnastics, driver, retry):
-		_add_with_retry(result, driver, retry, _add_gymnastics)
-
-	@staticmethod
-	def import_gymnastics(results: List[Gymnastics], driver = None, username = None, password = None, start_at: int = 0, retry: int = 5, onimport:Callable[[str], None] = None, onresumetokenupdated:Callable[[str], None] = None):
-		(driver, destroy) = _ensure_driver(driver, username, password)
+	def import_gymnastics(results: List[Gymnastics], driver = None, username = None, password = None, retry: int = 5, ledger: ImportLedger = None, deadletters: DeadLetters = None, onimport:Callable[[str], None] = None, engine: str = 'browser'):
+		(driver, destroy) = _ensure_driver(driver, username, password, engine)
 		try:
-			for index,result in enumerate(results[start_at:], start=start_at):
-				WodifyDriver._import_gymnastics(result, driver, retry)
-				_notify(result, 'gymnastics', index, onimport, onresumetokenupdated)
+			_import_records(results, driver, retry, _get_handlers(engine), ledger, deadletters, onimport)
 		finally:
 			_cleanup(driver, destroy)
 
 	@staticmethod
-	def _import_weightlifting(result: Weighlifting, driver, retry):
-		_add_with_retry(result, driver, retry, _add_weightlifting)
-
-	@staticmethod
-	def import_weightlifting(results: List[Weighlifting], driver = None, username = None, password = None, start_at: int = 0, retry: int = 5, onimport:Callable[[str], None] = None, onresumetokenupdated:Callable[[str], None] = None):
-		(driver, destroy) = _ensure_driver(driver, username, password)
+	def import_weightlifting(results: List[Weighlifting], driver = None, username = None, password = None, retry: int = 5, ledger: ImportLedger = None, deadletters: DeadLetters = None, onimport:Callable[[str], None] = None, engine: str = 'browser'):
+		(driver, destroy) = _ensure_driver(driver, username, password, engine)
 		try:
-			for index,result in enumerate(results[start_at:], start=start_at):
-				WodifyDriver._import_weightlifting(result, driver, retry)
-				_notify(result, 'weightlifting', index, onimport, onresumetokenupdated)
+			_import_records(results, driver, retry, _get_handlers(engine), ledger, deadletters, onimport)
 		finally:
 			_cleanup(driver, destroy)
 
 	@staticmethod
-	def _import_metcon(result: Metcon, driver, retry):
-		_add_with_retry(result, driver, retry, _add_metcon)
-
-	@staticmethod
-	def import_metcon(results: List[Metcon], driver = None, username = None, password = None, start_at: int = 0, retry: int = 5, onimport:Callable[[str], None] = None, onresumetokenupdated:Callable[[str], None] = None):
-		(driver, destroy) = _ensure_driver(driver, username, password)
+	def import_metcon(results: List[Metcon], driver = None, username = None, password = None, retry: int = 5, ledger: ImportLedger = None, deadletters: DeadLetters = None, onimport:Callable[[str], None] = None, engine: str = 'browser'):
+		(driver, destroy) = _ensure_driver(driver, username, password, engine)
 		try:
-			for index,result in enumerate(results[start_at:], start=start_at):
-				WodifyDriver._import_metcon(result, driver, retry)
-				_notify(result, 'metcon', index, onimport, onresumetokenupdated)
+			_import_records(results, driver, retry, _get_handlers(engine), ledger, deadletters, onimport)
 		finally:
 			_cleanup(driver, destroy)
 
 	@staticmethod
-	def import_all(results: WorkoutResults, driver = None, username = None, password = None, resumetoken: str = None, retry: int = 5, onimport:Callable[[str], None] = None, onresumetokenupdated:Callable[[str], None] = None):
-		(driver, destroy) = _ensure_driver(driver, username, password)
-		(kind,index) = resumetoken.split(':') if resumetoken != None and len(resumetoken) > 0 else (None, 0)
+	def import_all(results: WorkoutResults, driver = None, username = None, password = None, retry: int = 5, ledger: ImportLedger = None, deadletters: DeadLetters = None, onimport:Callable[[str], None] = None, engine: str = 'browser'):
+		(driver, destroy) = _ensure_driver(driver, username, password, engine)
 		try:
-			if (kind == None or kind == 'gymnastics'):
-				WodifyDriver.import_gymnastics(results.gymnastics, driver=driver, start_at=int(index), retry=retry, onimport=onimport, onresumetokenupdated=onresumetokenupdated)
-				kind = None
-				index = 0
-
-			if (kind == None or kind == 'weightlifting'):
-				WodifyDriver.import_weightlifting(results.weightlifting, driver=driver, start_at=int(index), retry=retry, onimport=onimport, onresumetokenupdated=onresumetokenupdated)
-				kind = None
-				inded = 0
-
-			if (kind == None or kind == 'metcon'):
-				WodifyDriver.import_metcon(results.metcons, driver=driver, start_at=int(index), retry=retry, onimport=onimport, onresumetokenupdated=onresumetokenupdated)
-
-			if (onresumetokenupdated != None):
-				onresumetokenupdated(None)
+			WodifyDriver.import_gymnastics(results.gymnastics, driver=driver, retry=retry, ledger=ledger, deadletters=deadletters, onimport=onimport, engine=engine)
+			WodifyDriver.import_weightlifting(results.weightlifting, driver=driver, retry=retry, ledger=ledger, deadletters=deadletters, onimport=onimport, engine=engine)
+			WodifyDriver.import_metcon(results.metcons, driver=driver, retry=retry, ledger=ledger, deadletters=deadletters, onimport=onimport, engine=engine)
 		finally:
 			_cleanup(driver, destroy)
 
 	@staticmethod
-	def load_resume_token(file: str):
-		if (os.path.exists(file)):
-			with open(file, 'r', encoding='utf8', newline=None) as f:
-				return f.read()
-		return None
+	def import_stream(results: Iterable[WorkoutResult], driver = None, username = None, password = None, kind: str = None, retry: int = 5, ledger: ImportLedger = None, deadletters: DeadLetters = None, onimport:Callable[[str], None] = None, engine: str = 'browser'):
+		# Imports records in the order that they are read, e.g. from NdjsonResults, without loading them all up front
+		(driver, destroy) = _ensure_driver(driver, username, password, engine)
+		try:
+			_import_records((result for result in results if kind == None or get_kind(result) == kind), driver, retry, _get_handlers(engine), ledger, deadletters, onimport)
+		finally:
+			_cleanup(driver, destroy)
 
 	@staticmethod
-	def track_resume_token(file: str) -> Callable[[str], None]:
-		return lambda token: _write_resume_token(file, token)
-
+	def import_parallel(results: Iterable[WorkoutResult], workers: int = 4, username = None, password = None, kind: str = None, retry: int = 5, ledger: ImportLedger = None, deadletters: DeadLetters = None, onimport:Callable[[str], None] = None, driverfactory: Callable[[], Any] = None, handlers: Dict[type, Callable] = None, engine: str = 'browser') -> int:
+		# Imports records with a pool of browser sessions. driverfactory and handlers replace how sessions are created
+		# and how a record is entered, e.g. with a stand-in driver that does not need a browser.
+		if (driverfactory == None):
+			driverfactory = lambda: _ensure_driver(None, username, password, engine)[0]
+		pool = _ImportPool(workers, driverfactory, retry, handlers if handlers != None else _get_handlers(engine), ledger, deadletters, onimport)
+		return pool.run(result for result in results if kind == None or get_kind(result) == kind)
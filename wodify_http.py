@@ -0,0 +1,175 @@
+import requests
+from requests.adapters import HTTPAdapter
+from lxml import html
+from typing import Dict
+from wodify_data import Weighlifting, Gymnastics, Metcon
+from wodify_driver import _goto_addperformance, _get_metcon_measure, ValidationError, SessionExpiredError, UnconfirmedSaveError
+from wodify_catalog import normalize_component
+
+_COMPONENT = 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_wtUserComponent_'
+_COMPONENT_EDIT = 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_wtComponentEdit_wtWODComponent_'
+_RESULT_EDIT = 'AthleteTheme_wt1_block_wtMainContent_WOD_UI_wt2_block_Performance_UI_wtPerformanceResultEdit_block_'
+
+COMPONENT_TYPE = _COMPONENT + 'ComponentTypeId'
+COMPONENT_NON_METCON = _COMPONENT + 'ComponentIdNonMetcon'
+COMPONENT_METCON = _COMPONENT + 'ComponentIdMetcon'
+DESCRIPTION = _COMPONENT_EDIT + 'Description'
+RESULT_TYPE = _COMPONENT_EDIT + 'ResultTypeId'
+DATE = _RESULT_EDIT + 'W_Utils_UI_wtDatepicker_block_wtDateInputFrom'
+REP_SCHEME = _RESULT_EDIT + 'wtUserComponent_MeasureRepScheme'
+SETS = _RESULT_EDIT + 'wtPerformanceResult_Sets'
+REPS = _RESULT_EDIT + 'wtPerformanceResult_Reps'
+WEIGHT = _RESULT_EDIT + 'wtPerformanceResult_Weight'
+COMMENT = _RESULT_EDIT + 'wtPerformanceResult_Comment'
+PRESCRIBED = _RESULT_EDIT + 'wt214'
+SAVE = _RESULT_EDIT + 'wt200'
+
+class _FormState:
+	# The hidden inputs of the add performance form, which carry the view state and anti-forgery token of the page,
+	# along with the names and options of its fields
+	def __init__(self, text: str):
+		tree = html.fromstring(text)
+		self.hidden = {}
+		self.names = {}
+		self.kinds = {}
+		self.options = {}
+		for element in tree.xpath('//input|//select|//textarea'):
+			name = element.get('name')
+			if (name == None):
+				continue
+			kind = element.get('type', element.tag).lower()
+			if (kind == 'hidden'):
+				self.hidden[name] = element.get('value', '')
+			if (element.get('id') != None):
+				self.names[element.get('id')] = name
+				self.kinds[element.get('id')] = kind
+				if (element.tag == 'select'):
+					self.options[element.get('id')] = dict((normalize_component(option.text_content()), option.get('value')) for option in element.xpath('.//option'))
+
+class WodifyHttpSession:
+	# Posts the add performance form over HTTP with the cookies of a browser that has already signed in. The form is
+	# posted once per result instead of being filled in field by field.
+	def __init__(self, session: requests.Session, url: str):
+		self.session = session
+		self.url = url
+		self._state = None
+		self.refresh()
+
+	@staticmethod
+	def from_driver(driver, pool: int = 4) -> 'WodifyHttpSession':
+		_goto_addperformance(driver)
+		session = requests.session()
+		adapter = HTTPAdapter(pool_connections=pool, pool_maxsize=pool)
+		session.mount('https://', adapter)
+		session.mount('http://', adapter)
+		session.headers['User-Agent'] = driver.execute_script('return navigator.userAgent')
+		for cookie in driver.get_cookies():
+			session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+		return WodifyHttpSession(session, driver.current_url)
+
+	def _load(self, response: requests.Response):
+		if (response.status_code == 422):
+			raise ValidationError(f'Wodify rejected the result: {response.text[:200]}')
+		response.raise_for_status()
+		state = _FormState(response.text)
+		if (SAVE not in state.names):
+			raise SessionExpiredError('Wodify did not return the add performance form. The session may have expired')
+		self._state = state
+
+	def refresh(self):
+		self._load(self.session.get(self.url))
+
+	def quit(self):
+		self.session.close()
+
+	def option(self, id: str, text: str):
+		return self._state.options.get(id, {}).get(normalize_component(text))
+
+	def submit(self, fields: Dict[str, object]):
+		state = self._state
+		data = dict(state.hidden)
+		for (id, value) in fields.items():
+			if (id not in state.names or value == None):
+				raise ValidationError(f'The add performance form does not have a value for {id}')
+			if (state.kinds[id] == 'checkbox'):
+				if (value):
+					data[state.names[id]] = 'on'
+			else:
+				data[state.names[id]] = str(value)
+		data[state.names[SAVE]] = 'Save'
+		response = self.session.post(self.url, data=data)
+		try:
+			self._load(response)
+		except SessionExpiredError as e:
+			# The result may have been saved before the form was lost, so it is not posted again. The form is loaded
+			# again for the next result, which fails the same way when the session is gone.
+			try:
+				self.refresh()
+			except Exception:
+				pass
+			raise UnconfirmedSaveError(f'The result was posted but it is unknown whether it was saved: {e}') from e
+
+def _search_component(session: WodifyHttpSession, component: str, id: str, allowretry: bool = True):
+	value = session.option(id, component)
+	if (value == None and component.endswith('s') and allowretry == True):
+		value = session.option(id, component[:-1])
+	return value
+
+def _notes(fields: Dict[str, object], notes: str) -> Dict[str, object]:
+	if (notes != None and len(notes) > 0):
+		fields[COMMENT] = notes
+	return fields
+
+def _add_metcon(result: Metcon, session: WodifyHttpSession):
+	measure = _get_metcon_measure(result)
+	component = _search_component(session, result.name, COMPONENT_METCON, allowretry=False) if result.benchmark else None
+	fields = {
+		COMPONENT_TYPE: '2',
+		DATE: result.date
+	}
+	if (component == None):
+		fields[COMPONENT_METCON] = _search_component(session, 'Non-Benchmark Metcon', COMPONENT_METCON, allowretry=False)
+		fields[DESCRIPTION] = result.name
+		fields[RESULT_TYPE] = measure.type
+	else:
+		fields[COMPONENT_METCON] = component
+	fields.update(measure.fields(result.prescribed))
+
+	session.submit(_notes(fields, result.notes))
+	# False when a benchmark had to fall back to a Non-Benchmark Metcon
+	return (component != None) == result.benchmark
+
+def _add_component(result, session: WodifyHttpSession, type: str, fields: Dict[str, object]):
+	component = _search_component(session, result.name, COMPONENT_NON_METCON)
+	if (component == None):
+		_add_metcon(Metcon(
+			date=result.date, \
+			name=result.name, \
+			measure=None, \
+			prescribed=True, \
+			notes=result.notes, \
+			benchmark=False), session)
+		return False
+
+	fields.update({
+		COMPONENT_TYPE: type,
+		COMPONENT_NON_METCON: component,
+		DATE: result.date,
+		REP_SCHEME: result.name,
+		SETS: result.sets,
+		REPS: result.reps
+	})
+	session.submit(_notes(fields, result.notes))
+	return True
+
+def _add_gymnastics(result: Gymnastics, session: WodifyHttpSession):
+	return _add_component(result, session, '1', {PRESCRIBED: result.prescribed})
+
+def _add_weightlifting(result: Weighlifting, session: WodifyHttpSession):
+	return _add_component(result, session, '5', {WEIGHT: result.weight})
+
+HANDLERS = {
+	Gymnastics: _add_gymnastics,
+	Weighlifting: _add_weightlifting,
+	Metcon: _add_metcon
+}
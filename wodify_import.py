@@ -1,24 +1,51 @@
 if __name__ == "__main__":
+	import os
+	import shutil
 	import sys
-	import path
 	import json
-	from wodify_data import WorkoutResults, Weighlifting, Gymnastics, Metcon
+	import itertools
+	from wodify_data import Weighlifting, Gymnastics, Metcon, NdjsonResults
 	from wodify_driver import WodifyDriver
-
-	resumetoken = WodifyDriver.load_resume_token('.resume')
-	trackresumetoken = WodifyDriver.track_resume_token('.resume')
+	from wodify_ledger import ImportLedger, DeadLetters
 
 	if (len(sys.argv) < 3):
 		raise Exception('Must provide username and password')
 
-	jsonpath = 'wodify.json' if (len(sys.argv) <= 3) else sys.argv[2]
-	component = 'all' if (len(sys.argv) <= 4) else sys.argv[3]
-	with open(jsonpath, 'r', encoding='utf8', newline=None) as f:
-		data = json.load(f)
+	jsonpath = 'wodify.ndjson' if (len(sys.argv) <= 3) else sys.argv[3]
+	component = 'all' if (len(sys.argv) <= 4) else sys.argv[4]
+	deadletters = DeadLetters('.deadletters.ndjson')
+	replay = None
+	if (os.path.exists(jsonpath) and os.path.exists(deadletters.path) and os.path.samefile(jsonpath, deadletters.path)):
+		# Replaying the dead letters, so the results that fail again are written to a new file
+		replay = jsonpath = deadletters.path + '.replay'
+		if (os.path.exists(replay)):
+			# An earlier replay was stopped, so the new dead letters are added to it instead of replacing it. The results
+			# of it that were already imported are skipped by the ledger.
+			with open(deadletters.path, 'r', encoding='utf8', newline=None) as src, open(replay, 'a', encoding='utf8', newline=None) as dst:
+				shutil.copyfileobj(src, dst)
+			os.remove(deadletters.path)
+		else:
+			os.replace(deadletters.path, replay)
+
+	kind = None if component == 'all' else component
+	if (jsonpath.endswith('.json')):
+		with open(jsonpath, 'r', encoding='utf8', newline=None) as f:
+			data = json.load(f)
+
+		gymnastics = [Gymnastics(**g) for g in data.get('gymnastics')]
+		weightlifting = [Weighlifting(**w) for w in data.get('weightlifting')]
+		metcons = [Metcon(**m) for m in data.get('metcons')]
+		# Imported in the same order as WodifyDriver.import_all, but only the results of the kind that was asked for
+		results = itertools.chain(gymnastics, weightlifting, metcons)
+	else:
+		# Records are read lazily so only the record being imported is held in memory
+		results = NdjsonResults(jsonpath)
 
-	gymnastics = [Gymnastics(**g) for g in data.get('gymnastics')]
-	weightlifting = [Weighlifting(**w) for w in data.get('weightlifting')]
-	metcons = [Metcon(**m) for m in data.get('metcons')]
-	results = WorkoutResults(gymnastics=gymnastics, weightlifting=weightlifting, metcons=metcons)
+	with ImportLedger('.ledger') as ledger:
+		WodifyDriver.import_stream(results, username=sys.argv[1], password=sys.argv[2], kind=kind, ledger=ledger, deadletters=deadletters, onimport=lambda name: print(f'Imported {name}'))
 
-	getattr(WodifyDriver, f'import_{component}')(getattr(results, component), username=sys.argv[1], password=sys.argv[2], resumetoken=resumetoken, onimport=lambda name: print(f'Imported {name}'), onresumetokenupdated=trackresumetoken)
+	if (replay != None):
+		# Every result of the replay was either imported or written to the dead letters again
+		os.remove(replay)
+	if (len(deadletters) > 0):
+		print(f'{len(deadletters)} results could not be imported and were saved to {deadletters.path}')
@@ -0,0 +1,85 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from wodify_data import WorkoutResult, get_kind
+
+IMPORTED = 'imported'
+FALLBACK = 'fallback'
+
+def get_record_key(record: WorkoutResult) -> str:
+	content = record._asdict()
+	content['kind'] = get_kind(record)
+	return hashlib.sha1(json.dumps(content, sort_keys=True).encode('utf8')).hexdigest()
+
+class ImportLedger:
+	# Remembers which records have been imported by a hash of their content so that an import can be restarted,
+	# or re-run on an edited file, without importing the same result twice. Writes are committed in batches and
+	# whenever flush() is called.
+	def __init__(self, path: str = '.ledger', batch: int = 16):
+		self.path = path
+		self.batch = batch
+		self._connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+		self._connection.execute('PRAGMA journal_mode=WAL')
+		self._connection.execute('PRAGMA synchronous=NORMAL')
+		self._connection.execute('CREATE TABLE IF NOT EXISTS imports (key TEXT PRIMARY KEY, kind TEXT, name TEXT, date TEXT, status TEXT, updated REAL)')
+		self._imported = set(row[0] for row in self._connection.execute('SELECT key FROM imports WHERE status IN (?, ?)', (IMPORTED, FALLBACK)))
+		self._pending = []
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def __len__(self):
+		return len(self._imported)
+
+	def is_imported(self, record: WorkoutResult) -> bool:
+		return get_record_key(record) in self._imported
+
+	def record(self, record: WorkoutResult, status: str = IMPORTED):
+		key = get_record_key(record)
+		if (status == IMPORTED or status == FALLBACK):
+			self._imported.add(key)
+		else:
+			self._imported.discard(key)
+		self._pending.append((key, get_kind(record), record.name, record.date, status, time.time()))
+		if (len(self._pending) >= self.batch):
+			self.flush()
+
+	def flush(self):
+		if (len(self._pending) > 0):
+			with self._connection:
+				self._connection.executemany('INSERT OR REPLACE INTO imports (key, kind, name, date, status, updated) VALUES (?, ?, ?, ?, ?, ?)', self._pending)
+			self._pending = []
+
+	def close(self):
+		if (self._connection != None):
+			self.flush()
+			self._connection.close()
+			self._connection = None
+
+class DeadLetters:
+	# Records that could not be imported, appended in the same format as wodify.ndjson along with why they failed, so
+	# that the file can be imported again once the cause has been fixed
+	def __init__(self, path: str = '.deadletters.ndjson'):
+		self.path = path
+		self.count = 0
+		self._lock = threading.Lock()
+
+	def __len__(self):
+		return self.count
+
+	def add(self, record: WorkoutResult, failure: str, error: Exception):
+		line = record._asdict()
+		line['kind'] = get_kind(record)
+		line['failure'] = failure
+		line['error'] = f'{type(error).__name__}: {error}'
+		line['failed'] = time.time()
+		with self._lock:
+			with open(self.path, 'a', encoding='utf8', newline=None) as f:
+				f.write(json.dumps(line))
+				f.write('\n')
+			self.count += 1
@@ -0,0 +1,90 @@
+import threading
+import time
+from queue import Queue, Full
+from typing import Iterable, Iterator, Callable
+import bwtb_data as bwtb
+from wodify_data import WorkoutResults, WorkoutResult
+from wodify_driver import WodifyDriver
+from pipeline_metrics import metrics
+
+_DONE = object()
+
+_queue_waits = metrics.histogram('wodify_pipeline_wait_seconds', 'Time that a pipeline stage spent blocked on its queue by stage and side')
+_first_import = metrics.histogram('wodify_pipeline_first_import_seconds', 'Time from the start of the pipeline to the first imported result')
+
+class _Failed:
+	def __init__(self, error: BaseException):
+		self.error = error
+
+class ThreadedIterator:
+	# Iterates over iterable on its own thread, at most maxsize items ahead of the consumer. Errors are raised to the
+	# consumer and closing the iterator stops the thread.
+	def __init__(self, iterable: Iterable, maxsize: int = 256, name: str = 'stage'):
+		self.name = name
+		self._queue = Queue(maxsize=maxsize)
+		self._stopped = threading.Event()
+		self._thread = threading.Thread(target=self._run, args=(iterable,), daemon=True)
+		self._thread.start()
+
+	def _put(self, item) -> bool:
+		start = time.perf_counter()
+		while (self._stopped.is_set() == False):
+			try:
+				self._queue.put(item, timeout=0.1)
+				_queue_waits.observe(time.perf_counter() - start, stage=self.name, side='put')
+				return True
+			except Full:
+				pass
+		return False
+
+	def _run(self, iterable: Iterable):
+		try:
+			for item in iterable:
+				if (self._put(item) == False):
+					return
+			self._put(_DONE)
+		except BaseException as e:
+			self._put(_Failed(e))
+
+	def __iter__(self):
+		try:
+			while True:
+				start = time.perf_counter()
+				item = self._queue.get()
+				_queue_waits.observe(time.perf_counter() - start, stage=self.name, side='get')
+				if (item is _DONE):
+					return
+				if (isinstance(item, _Failed)):
+					raise item.error
+				yield item
+		finally:
+			self.close()
+
+	def close(self):
+		self._stopped.set()
+
+def _produce(csvpath: str, download: Callable[[], None], cache, snapshot, ignored_result) -> Iterator[WorkoutResult]:
+	if (download != None):
+		download()
+	for record in WorkoutResults.iter_bwtb(bwtb.parse_workout_csv(csvpath, cache=cache, snapshot=snapshot), ignored_result):
+		yield record
+
+def import_pipelined(csvpath: str, download: Callable[[], None] = None, workers: int = 1, queuesize: int = 256, cache: bwtb.WorkoutCache = None, snapshot: bwtb.WorkoutSnapshot = None, ignored_result: Callable[[bwtb.WorkoutResult], None] = None, onimport: Callable[[str], None] = None, **options) -> int:
+	# Downloading, parsing and transforming run on their own thread and feed the import through a bounded queue. The
+	# browser sessions of the import are started at the same time, so they sign in while the export is downloaded and
+	# the first result is imported while the rest are still being parsed. Options are passed to import_parallel.
+	start = time.perf_counter()
+	first = []
+
+	def notify(name: str):
+		if (len(first) == 0):
+			first.append(time.perf_counter() - start)
+			_first_import.observe(first[0])
+		if (onimport != None):
+			onimport(name)
+
+	records = ThreadedIterator(_produce(csvpath, download, cache, snapshot, ignored_result), queuesize, name='transform')
+	try:
+		return WodifyDriver.import_parallel(records, workers=workers, onimport=notify, **options)
+	finally:
+		records.close()
@@ -0,0 +1,277 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import NamedTuple, List, Dict, Callable, Any
+from wodify_data import NdjsonResults, get_kind
+from wodify_driver import _ensure_driver, _add_with_retry, _get_handlers, _notify, _SessionHealth
+from wodify_ledger import ImportLedger, DeadLetters, IMPORTED, FALLBACK
+from pipeline_metrics import metrics
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+_slices = metrics.counter('wodify_scheduler_slices_total', 'Slices of an import job run by a browser slot by how they ended')
+_slice_seconds = metrics.histogram('wodify_scheduler_slice_seconds', 'Time that an import job held a browser slot')
+_signins = metrics.counter('wodify_scheduler_signins_total', 'Browser sessions started by the scheduler to switch to another athlete')
+
+class ImportJob(NamedTuple):
+	id: int
+	username: str
+	path: str
+	kind: str
+	status: str
+	position: int
+	total: int
+	imported: int
+	failed: int
+	slices: int
+	attempts: int
+	error: str
+
+_JOB_COLUMNS = ', '.join(ImportJob._fields)
+_LEASE_SECONDS = 60
+
+class _Slot:
+	# The browser session of one slot, kept signed in between slices so that a slot that is handed the same athlete
+	# again does not have to sign in again
+	def __init__(self):
+		self.username = None
+		self.driver = None
+
+	def release(self):
+		if (self.driver != None):
+			try:
+				self.driver.quit()
+			finally:
+				self.username = None
+				self.driver = None
+
+class JobScheduler:
+	# A persistent queue of import jobs, one per athlete and results file, that are run by a fixed number of browser
+	# slots. A job holds a slot for at most slice_records results or slice_seconds before it goes to the back of the
+	# queue, so a long history does not hold up the athletes behind it. Progress is saved after every slice and every
+	# job has its own ledger, so a job that is interrupted resumes where it left off without importing anything twice.
+	def __init__(self, directory: str = '.jobs', slots: int = 4, slice_records: int = 50, slice_seconds: float = 600, retry: int = 5, attempts: int = 3, engine: str = 'browser', driverfactory: Callable[[str, str], Any] = None, handlers: Dict[type, Callable] = None):
+		self.directory = directory
+		self.slots = slots
+		self.slice_records = slice_records
+		self.slice_seconds = slice_seconds
+		self.retry = retry
+		self.attempts = attempts
+		self.handlers = handlers if handlers != None else _get_handlers(engine)
+		if (driverfactory == None):
+			driverfactory = lambda username, password: _ensure_driver(None, username, password, engine)[0]
+		self.driverfactory = driverfactory
+		self._lock = threading.Lock()
+		self._changed = threading.Condition(self._lock)
+		self._stopped = threading.Event()
+		os.makedirs(directory, exist_ok=True)
+		self._connection = sqlite3.connect(os.path.join(directory, 'jobs.db'), timeout=60, check_same_thread=False)
+		self._connection.execute('PRAGMA journal_mode=WAL')
+		self._connection.execute('CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT, password TEXT, path TEXT, kind TEXT, status TEXT, position INTEGER, total INTEGER, imported INTEGER, failed INTEGER, slices INTEGER, attempts INTEGER, error TEXT, scheduled REAL, updated REAL)')
+		self._connection.execute('CREATE TABLE IF NOT EXISTS lease (id INTEGER PRIMARY KEY CHECK (id = 1), owner TEXT, heartbeat REAL)')
+		self._owner = f'{os.getpid()}-{id(self)}-{time.time()}'
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def close(self):
+		if (self._connection != None):
+			self._connection.close()
+			self._connection = None
+
+	def add(self, username: str, password: str, path: str, kind: str = None) -> int:
+		total = len(NdjsonResults(path))
+		with self._lock, self._connection:
+			cursor = self._connection.execute('INSERT INTO jobs (username, password, path, kind, status, position, total, imported, failed, slices, attempts, error, scheduled, updated) VALUES (?, ?, ?, ?, ?, 0, ?, 0, 0, 0, 0, NULL, 0, ?)', (username, password, os.path.abspath(path), kind, QUEUED, total, time.time()))
+			self._changed.notify_all()
+			return cursor.lastrowid
+
+	def retry_failed(self):
+		with self._lock, self._connection:
+			self._connection.execute('UPDATE jobs SET status = ?, attempts = 0, error = NULL WHERE status = ?', (QUEUED, FAILED))
+			self._changed.notify_all()
+
+	def jobs(self) -> List[ImportJob]:
+		with self._lock:
+			return [ImportJob(*row) for row in self._connection.execute(f'SELECT {_JOB_COLUMNS} FROM jobs ORDER BY id')]
+
+	def stop(self):
+		# Slots finish the slice that they are running, save it and exit
+		self._stopped.set()
+		with self._lock:
+			self._changed.notify_all()
+
+	def _acquire_lease(self):
+		# Only one process runs the jobs at a time. The lease is renewed by a heartbeat and can be taken over once the
+		# process that held it has not renewed it for _LEASE_SECONDS, i.e. it has stopped.
+		with self._lock:
+			connection = self._connection
+			connection.execute('BEGIN IMMEDIATE')
+			try:
+				row = connection.execute('SELECT owner, heartbeat FROM lease WHERE id = 1').fetchone()
+				if (row != None and row[0] != self._owner and time.time() - row[1] < _LEASE_SECONDS):
+					raise Exception(f'The jobs in {self.directory} are already being run by another process')
+				connection.execute('INSERT OR REPLACE INTO lease (id, owner, heartbeat) VALUES (1, ?, ?)', (self._owner, time.time()))
+				# Jobs that were running when the last process stopped are picked up again from their last saved position
+				connection.execute('UPDATE jobs SET status = ? WHERE status = ?', (QUEUED, RUNNING))
+				connection.execute('COMMIT')
+			except:
+				connection.execute('ROLLBACK')
+				raise
+
+	def _release_lease(self):
+		with self._lock, self._connection:
+			self._connection.execute('DELETE FROM lease WHERE id = 1 AND owner = ?', (self._owner,))
+
+	def _heartbeat(self, finished: threading.Event):
+		while (finished.wait(_LEASE_SECONDS / 4) == False):
+			with self._lock, self._connection:
+				renewed = self._connection.execute('UPDATE lease SET heartbeat = ? WHERE id = 1 AND owner = ?', (time.time(), self._owner)).rowcount
+			if (renewed == 0):
+				# Another process took the jobs over, so the slots stop after the slice that they are running
+				self.stop()
+				return
+
+	def run(self, onprogress: Callable[[ImportJob], None] = None, onimport: Callable[[str], None] = None):
+		# Runs until every job is done or failed, or until stop() is called
+		self._acquire_lease()
+		self._stopped.clear()
+		finished = threading.Event()
+		heartbeat = threading.Thread(target=self._heartbeat, args=(finished,), daemon=True)
+		heartbeat.start()
+		threads = [threading.Thread(target=self._work, args=(onprogress, onimport), daemon=True) for _ in range(self.slots)]
+		for thread in threads:
+			thread.start()
+		try:
+			for thread in threads:
+				thread.join()
+		except KeyboardInterrupt:
+			self.stop()
+			for thread in threads:
+				thread.join()
+			raise
+		finally:
+			finished.set()
+			heartbeat.join()
+			self._release_lease()
+
+	def _get_job(self, id: int) -> ImportJob:
+		return ImportJob(*self._connection.execute(f'SELECT {_JOB_COLUMNS} FROM jobs WHERE id = ?', (id,)).fetchone())
+
+	def _take(self, username: str):
+		# The queued job that has waited longest for a slot. A slot that is already signed in as one of the athletes
+		# that are waiting just as long keeps its session.
+		with self._lock:
+			while (self._stopped.is_set() == False):
+				rows = self._connection.execute('SELECT id, username, password, scheduled FROM jobs WHERE status = ? ORDER BY scheduled, id', (QUEUED,)).fetchall()
+				if (len(rows) > 0):
+					(id, _, password, _) = next((row for row in rows if row[1] == username and row[3] == rows[0][3]), rows[0])
+					with self._connection:
+						self._connection.execute('UPDATE jobs SET status = ?, scheduled = ? WHERE id = ?', (RUNNING, time.time(), id))
+					return (self._get_job(id), password)
+				running = self._connection.execute('SELECT COUNT(*) FROM jobs WHERE status = ?', (RUNNING,)).fetchone()[0]
+				if (running == 0):
+					return (None, None)
+				# Another slot may still put its job back in the queue
+				self._changed.wait(1)
+			return (None, None)
+
+	def _save(self, job: ImportJob, status: str, position: int, imported: int, failed: int, attempts: int, error: str):
+		with self._lock:
+			# A job that no other job is waiting for keeps its slot instead of being signed in again on another one
+			if (status == QUEUED and self._stopped.is_set() == False and self._connection.execute('SELECT COUNT(*) FROM jobs WHERE status = ?', (QUEUED,)).fetchone()[0] == 0):
+				status = RUNNING
+			with self._connection:
+				self._connection.execute('UPDATE jobs SET status = ?, position = ?, imported = imported + ?, failed = failed + ?, slices = slices + 1, attempts = ?, error = ?, updated = ? WHERE id = ?', (status, position, imported, failed, attempts, error, time.time(), job.id))
+			self._changed.notify_all()
+			return self._get_job(job.id)
+
+	def _work(self, onprogress: Callable[[ImportJob], None], onimport: Callable[[str], None]):
+		slot = _Slot()
+		job = None
+		try:
+			while True:
+				if (job == None or job.status != RUNNING):
+					(job, password) = self._take(slot.username)
+					if (job == None):
+						return
+				job = self._run_slice(slot, job, password, onimport)
+				if (onprogress != None):
+					onprogress(job)
+		finally:
+			slot.release()
+
+	def _run_slice(self, slot: _Slot, job: ImportJob, password: str, onimport: Callable[[str], None]) -> ImportJob:
+		start = time.perf_counter()
+		position = job.position
+		imported = 0
+		deadletters = DeadLetters(os.path.join(self.directory, f'job-{job.id}.deadletters.ndjson'))
+		health = _SessionHealth()
+		try:
+			if (slot.username != job.username):
+				slot.release()
+				slot.driver = self.driverfactory(job.username, password)
+				slot.username = job.username
+				_signins.inc()
+
+			status = DONE
+			with ImportLedger(os.path.join(self.directory, f'job-{job.id}.ledger')) as ledger:
+				for result in NdjsonResults(job.path).iter_from(job.position):
+					if (imported >= self.slice_records or time.perf_counter() - start >= self.slice_seconds or self._stopped.is_set()):
+						status = QUEUED
+						break
+					if ((job.kind == None or get_kind(result) == job.kind) and ledger.is_imported(result) == False):
+						added = _add_with_retry(result, slot.driver, self.retry, self.handlers, deadletters, health)
+						if (added != None):
+							ledger.record(result, IMPORTED if added else FALLBACK)
+							_notify(result, onimport)
+						imported += 1
+					position += 1
+			_slices.inc(status=status)
+			return self._save(job, status, position, imported - len(deadletters), len(deadletters), 0, None)
+		except Exception as e:
+			# The session is started again for the next slice, which resumes after the last result that was handled
+			slot.release()
+			attempts = job.attempts + 1
+			_slices.inc(status='error')
+			return self._save(job, FAILED if attempts >= self.attempts else QUEUED, position, imported - len(deadletters), len(deadletters), attempts, f'{type(e).__name__}: {e}')
+		finally:
+			_slice_seconds.observe(time.perf_counter() - start)
+
+def print_jobs(jobs: List[ImportJob]):
+	for job in jobs:
+		print(f'{job.id:>4} {job.status:<8} {job.position:>6}/{job.total:<6} {job.imported:>6} imported {job.failed:>4} failed  {job.username} {job.path}{" " + job.error if job.error else ""}')
+
+if __name__ == "__main__":
+	import sys
+
+	if (len(sys.argv) < 2 or sys.argv[1] not in ['add', 'run', 'status', 'retry']):
+		raise Exception('Must provide a command: add <wodify-username> <wodify-password> <input path> [<kind>], run [<slots>], status or retry')
+
+	if (sys.argv[1] == 'add'):
+		if (len(sys.argv) < 5):
+			raise Exception('Must provide username, password and input path')
+		with JobScheduler() as scheduler:
+			id = scheduler.add(sys.argv[2], sys.argv[3], sys.argv[4], None if len(sys.argv) <= 5 or sys.argv[5] == 'all' else sys.argv[5])
+			print(f'Added job {id}')
+	elif (sys.argv[1] == 'run'):
+		slots = 4 if (len(sys.argv) <= 2) else int(sys.argv[2])
+		with JobScheduler(slots=slots) as scheduler:
+			try:
+				scheduler.run(onprogress=lambda job: print_jobs([job]))
+			finally:
+				print_jobs(scheduler.jobs())
+	elif (sys.argv[1] == 'retry'):
+		with JobScheduler() as scheduler:
+			scheduler.retry_failed()
+			print_jobs(scheduler.jobs())
+	else:
+		with JobScheduler() as scheduler:
+			print_jobs(scheduler.jobs())